@@ -0,0 +1,190 @@
+"""
+Пакетный режим без интерфейса: фильтрует несколько книг АСКСМ тем же
+фильтром, что и главное окно, и сохраняет выборки в файлы.
+
+    python main.py --batch "archive/*.xlsx" --out filtered --format csv --types 0,1,2 --mines kir,ras
+
+Файлы обрабатываются параллельно в пуле процессов (по умолчанию по числу ядер).
+Столбцы, не заданные явно, подбираются по справочникам dict/cols, черные
+списки комментариев берутся из dict/blacklist.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dictionaries import COLUMN_DICTS, DictRegistry
+import engine
+import export
+from mines import KIR, RAS
+from workbook import Workbook
+
+MINES = {"kir": KIR, "ras": RAS}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py --batch", description="Пакетная фильтрация каталогов АСКСМ"
+    )
+    parser.add_argument("paths", nargs="+", help="файлы книг или шаблоны (*.xlsx, archive/**/*.xlsx)")
+    parser.add_argument("--sheet", help="лист книги, по умолчанию первый")
+    parser.add_argument("--out", help="папка для результатов, по умолчанию рядом с исходным файлом")
+    parser.add_argument(
+        "--format", default="csv", choices=[ext[1:] for label, ext in export.FORMATS]
+    )
+    parser.add_argument("--dict", default="dict", help="папка справочников")
+    parser.add_argument("--types", default="all", help="типы событий через запятую или all")
+    parser.add_argument("--mines", default="kir", help="рудники через запятую: kir, ras")
+    parser.add_argument("--geodesic", action="store_true", help="добавить геодезические координаты")
+    parser.add_argument(
+        "--no-decimal-comma", dest="decimal_comma", action="store_false",
+        help="не заменять десятичную точку на запятую",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="число процессов")
+    for key, filename, fallback in COLUMN_DICTS:
+        parser.add_argument(
+            "--" + key.replace("_", "-"),
+            dest=key,
+            help="столбец (по умолчанию из dict/cols/%s)" % filename,
+        )
+    return parser.parse_args(argv)
+
+
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        found = sorted(glob.glob(pattern, recursive=True))
+        # несуществующий путь оставляем, чтобы об ошибке сообщил его обработчик
+        paths.extend(found or [pattern])
+    return list(dict.fromkeys(paths))
+
+
+def output_path(path, out_dir, sheet, fmt, root=None):
+    """
+    Путь результата для книги path. Без out_dir результат кладется рядом с
+    книгой, с out_dir - в out_dir с сохранением пути книги относительно root
+    (общей папки всех входных книг), чтобы одноименные книги из разных папок
+    не перезаписывали друг друга.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if sheet is not None:
+        stem += "_" + sheet
+    if out_dir:
+        folder = os.path.dirname(os.path.abspath(path))
+        rel = os.path.relpath(folder, root) if root else os.curdir
+        out_dir = os.path.normpath(os.path.join(out_dir, rel))
+    else:
+        out_dir = os.path.dirname(path)
+    return os.path.join(out_dir, "%s_filtered.%s" % (stem, fmt))
+
+
+def output_paths(paths, out_dir, sheet, fmt):
+    """Словарь книга -> путь результата; ValueError, если два результата совпали."""
+    root = None
+    if out_dir and paths:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    outputs = {}
+    seen = {}
+    for path in paths:
+        out = output_path(path, out_dir, sheet, fmt, root)
+        key = os.path.normcase(os.path.abspath(out))
+        if key in seen:
+            raise ValueError("%s и %s сохраняются в один файл %s" % (seen[key], path, out))
+        seen[key] = path
+        outputs[path] = out
+    return outputs
+
+
+def process_file(path, out, options):
+    """
+    Фильтрует одну книгу и сохраняет выборку. Выполняется в процессе пула.
+    Возвращает (путь результата, число строк).
+    """
+    workbook = Workbook(path)
+    try:
+        sheet = options["sheet"] or workbook.sheet_names[0]
+        mapping = engine.suggest_mapping(workbook.header(sheet), options["column_names"])
+        mapping.update({k: v for k, v in options["columns"].items() if v is not None})
+        missing = [key for key, value in mapping.items() if value is None]
+        if missing:
+            raise ValueError("не найдены столбцы: %s" % ", ".join(missing))
+        spec = engine.FilterSpec(
+            columns=engine.ColumnMapping(**mapping),
+            types=options["types"],
+            mines=options["mines"],
+            kir_blacklist=options["blacklists"][0],
+            ras_blacklist=options["blacklists"][1],
+        )
+        view = engine.select(workbook.sheet(sheet), spec, options["geodesic"])
+        os.makedirs(os.path.dirname(out) or os.curdir, exist_ok=True)
+        export.write(
+            out,
+            view,
+            export.export_columns(spec.columns, options["geodesic"]),
+            decimal_comma=options["decimal_comma"],
+        )
+        return out, len(view)
+    finally:
+        workbook.close()
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.types == "all":
+        types = tuple(str(i) for i in range(15))
+    else:
+        types = tuple(t.strip() for t in args.types.split(",") if t.strip())
+    try:
+        mines = tuple(MINES[m.strip().lower()] for m in args.mines.split(",") if m.strip())
+    except KeyError as e:
+        print("неизвестный рудник: %s" % e, file=sys.stderr)
+        return 2
+    dicts = DictRegistry(args.dict)
+    options = {
+        "sheet": args.sheet,
+        "out": args.out,
+        "format": args.format,
+        "types": types,
+        "mines": mines,
+        # справочники читаем один раз и передаем в процессы
+        "blacklists": dicts.blacklists(),
+        "column_names": dicts.column_names(),
+        "geodesic": args.geodesic,
+        "decimal_comma": args.decimal_comma,
+        "columns": {key: getattr(args, key) for key, filename, fallback in COLUMN_DICTS},
+    }
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+
+    paths = expand_paths(args.paths)
+    try:
+        outputs = output_paths(paths, args.out, args.sheet, args.format)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    jobs = max(1, min(args.jobs, len(paths)))
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(process_file, path, outputs[path], options): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                out, count = future.result()
+            except Exception as e:
+                failed += 1
+                print("%s: ошибка: %s" % (path, e), file=sys.stderr)
+                continue
+            print("%s -> %s (%d строк)" % (path, out, count))
+    print(
+        "обработано файлов: %d, с ошибками: %d, за %.1f с"
+        % (len(paths), failed, time.perf_counter() - start)
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
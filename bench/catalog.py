@@ -0,0 +1,110 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from coltypes import format_column
+from dictionaries import DictRegistry
+
+# Синтетический каталог АСКСМ для замеров производительности.
+#
+# Столбцы как в выгрузке АСКСМ: координаты, энергия, время, тип события,
+# комментарий и исходный файл. События распределены по файлам KIR, RAS и
+# прочим, часть комментариев попадает в черные списки из dict/blacklist.
+
+COLUMNS = [
+    "EX",
+    "EY",
+    "EZ",
+    "EEnergy",
+    "ELocTime",
+    "ETypeId",
+    "EComment",
+    "ESourceFileName",
+]
+
+# доля событий каждого рудника: KIR, RAS, прочие
+MINE_SHARE = (0.55, 0.4, 0.05)
+# доля комментариев из черных списков
+BLACKLISTED_SHARE = 0.15
+# доля пустых ячеек в координатах и энергии
+BLANK_SHARE = 0.01
+EVENTS_PER_FILE = 500
+
+PLAIN_COMMENTS = ["", "", "", "ок", "повтор", "слабое", "проверено", "ручная обработка"]
+
+
+def blacklisted_comments(dict_dir="dict"):
+    """Комментарии, совпадающие с шаблонами черных списков (звездочки заменены текстом)."""
+    comments = []
+    for patterns in DictRegistry(dict_dir).blacklists():
+        for pattern in patterns:
+            comments.append(pattern.replace("*", " участок 3").replace("?", "a"))
+    return comments or ["Центр участок 3"]
+
+
+def generate(rows, seed=0, dict_dir="dict"):
+    """
+    DataFrame из rows событий с типизированными значениями (float с NaN для
+    пустых ячеек, datetime, int, строки) - в таком виде они пишутся в .xlsx.
+    """
+    rng = np.random.default_rng(seed)
+
+    def coord(low, high, decimals):
+        values = np.round(rng.uniform(low, high, rows), decimals)
+        values[rng.random(rows) < BLANK_SHARE] = np.nan
+        return values
+
+    files = max(1, rows // EVENTS_PER_FILE)
+    mine = rng.choice(3, size=files, p=MINE_SHARE)
+    suffixes = np.array([".KIR", ".RAS", ".TXT"], dtype=object)[mine]
+    file_names = np.array(
+        ["asksm_%06d%s" % (i, s) for i, s in enumerate(suffixes)], dtype=object
+    )
+    # события идут по времени, поэтому файлы занимают последовательные блоки строк
+    file_index = np.sort(rng.integers(0, files, rows))
+
+    plain = np.array(PLAIN_COMMENTS + ["c%d" % i for i in range(200)], dtype=object)
+    blacklisted = np.array(blacklisted_comments(dict_dir), dtype=object)
+    comments = plain[rng.integers(0, len(plain), rows)]
+    hit = rng.random(rows) < BLACKLISTED_SHARE
+    comments[hit] = blacklisted[rng.integers(0, len(blacklisted), hit.sum())]
+
+    start = np.datetime64("2020-01-01T00:00:00")
+    seconds = np.sort(rng.integers(0, 365 * 24 * 3600, rows))
+    return pd.DataFrame(
+        {
+            "EX": coord(10000, 40000, 1),
+            "EY": coord(30000, 45000, 2),
+            "EZ": coord(-1000, 800, 0),
+            "EEnergy": coord(0, 1e6, 3),
+            "ELocTime": pd.Series(start + seconds.astype("timedelta64[s]")),
+            "ETypeId": rng.integers(0, 15, rows),
+            "EComment": comments,
+            "ESourceFileName": file_names[file_index],
+        },
+        columns=COLUMNS,
+    )
+
+
+def as_text(df):
+    """Те же данные в виде строк, как их возвращает sheetreader.read_sheet."""
+    return pd.DataFrame(
+        {col: format_column(df[col]).to_numpy(dtype=object) for col in df.columns}
+    )
+
+
+def write_xlsx(df, path, sheet="Sheet1"):
+    """Записывает каталог в .xlsx потоковым писателем openpyxl."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(list(df.columns))
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            columns.append(list(s.dt.to_pydatetime()))
+        else:
+            columns.append(s.astype(object).where(s.notna(), None).tolist())
+    for row in zip(*columns):
+        ws.append(row)
+    wb.save(path)
@@ -0,0 +1,253 @@
+"""
+Замеры производительности конвейера на синтетических каталогах.
+
+    python -m bench.run --sizes 10000,100000,1000000,5000000 --out bench.json
+    python -m bench.run --sizes 10000,100000 --baseline bench.json
+
+Для каждого размера каталога замеряются этапы: разбор .xlsx, приведение
+типов, запись и чтение дискового кэша, фильтр (первый и повторный проход,
+смена типов, смена черного списка), сортировка, форматирование первых
+экранов таблицы и выгрузка. Результат - JSON со временем каждого этапа;
+с --baseline время сравнивается с прошлым запуском и при замедлении больше
+допуска программа завершается с кодом 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import engine
+import export
+import sheetreader
+from bench.catalog import as_text, generate, write_xlsx
+from dictionaries import DictRegistry
+from mines import KIR, RAS
+from sheetcache import SheetCache
+from workbook import SheetData
+
+SHEET = "Sheet1"
+# строк на экран таблицы (VirtualListCtrl.WINDOW)
+SCREEN_ROWS = 256
+
+
+class Timings:
+    def __init__(self, rows):
+        self.rows = rows
+        self.results = []
+
+    @contextmanager
+    def stage(self, name):
+        """Замеряет время блока; в словарь info можно положить число строк результата."""
+        info = {}
+        start = time.perf_counter()
+        yield info
+        seconds = time.perf_counter() - start
+        self.results.append(dict(rows=self.rows, stage=name, seconds=seconds, **info))
+        print("%10d  %-16s %9.3f s" % (self.rows, name, seconds), file=sys.stderr)
+
+
+def mapping():
+    return engine.ColumnMapping(
+        x_col="EX",
+        y_col="EY",
+        z_col="EZ",
+        value_col="EEnergy",
+        date_col="ELocTime",
+        type_id_col="ETypeId",
+        comment_col="EComment",
+        filename_col="ESourceFileName",
+    )
+
+
+def run_size(rows, args):
+    t = Timings(rows)
+    raw = generate(rows, seed=args.seed, dict_dir=args.dict)
+    text = as_text(raw)
+    del raw
+
+    source = os.path.join(args.workdir, "catalog_%d_%d.xlsx" % (rows, args.seed))
+    if rows <= args.xlsx_max:
+        if not os.path.exists(source):
+            write_xlsx(generate(rows, seed=args.seed, dict_dir=args.dict), source, SHEET)
+        with t.stage("xlsx_parse") as info:
+            parsed = sheetreader.read_sheet(source, SHEET)
+            info["result_rows"] = len(parsed)
+        del parsed
+    else:
+        # дисковому кэшу нужен только файл, по содержимому которого строится ключ
+        source = os.path.join(args.workdir, "catalog_%d_%d.key" % (rows, args.seed))
+        with open(source, "w") as f:
+            f.write(source)
+
+    with t.stage("convert"):
+        data = SheetData(SHEET, text)
+    del text
+
+    cache = SheetCache(os.path.join(args.workdir, "cache"))
+    cache.clear()
+    with t.stage("cache_put"):
+        cache.put(source, SHEET, data.df)
+    with t.stage("cache_load"):
+        # то же, что Workbook.cached, без открытия самой книги
+        data = SheetData(SHEET, cache.get(source, SHEET))
+
+    kir, ras = DictRegistry(args.dict).blacklists()
+    spec = engine.FilterSpec(
+        columns=mapping(),
+        types=tuple(str(i) for i in range(10)),
+        mines=(KIR, RAS),
+        kir_blacklist=kir,
+        ras_blacklist=ras,
+    )
+    with t.stage("filter_cold") as info:
+        result = engine.filter_rows(data.df, spec, data.masks)
+        info["result_rows"] = len(result)
+    with t.stage("filter_warm") as info:
+        result = engine.filter_rows(data.df, spec, data.masks)
+        info["result_rows"] = len(result)
+    spec = engine.FilterSpec(
+        columns=spec.columns,
+        types=tuple(str(i) for i in range(15)),
+        mines=spec.mines,
+        kir_blacklist=spec.kir_blacklist,
+        ras_blacklist=spec.ras_blacklist,
+    )
+    with t.stage("filter_types") as info:
+        result = engine.filter_rows(data.df, spec, data.masks)
+        info["result_rows"] = len(result)
+    spec = engine.FilterSpec(
+        columns=spec.columns,
+        types=spec.types,
+        mines=spec.mines,
+        kir_blacklist=spec.kir_blacklist + ("c1*",),
+        ras_blacklist=spec.ras_blacklist,
+    )
+    with t.stage("blacklist") as info:
+        result = engine.filter_rows(data.df, spec, data.masks)
+        info["result_rows"] = len(result)
+
+    view = engine.select(data, spec, geodesic=args.geodesic)
+    with t.stage("sort_cold"):
+        data.sort_order("EEnergy")
+    with t.stage("sort_view") as info:
+        view = view.sorted("EEnergy", descending=True)
+        info["result_rows"] = len(view)
+
+    header = [code for code, name in export.export_columns(spec.columns, args.geodesic)]
+    with t.stage("render") as info:
+        # первый экран и экран из середины, как при прокрутке
+        for start in (0, len(view) // 2):
+            for code in header:
+                view.text(code, start, start + SCREEN_ROWS)
+        info["result_rows"] = min(len(view), 2 * SCREEN_ROWS)
+
+    columns = export.export_columns(spec.columns, args.geodesic)
+    formats = ["csv"]
+    try:
+        import pyarrow  # noqa: F401
+
+        formats.append("parquet")
+    except ImportError:
+        ...
+    if rows <= args.xlsx_max:
+        formats.append("xlsx")
+    for fmt in formats:
+        path = os.path.join(args.workdir, "export_%d.%s" % (rows, fmt))
+        with t.stage("export_" + fmt) as info:
+            export.write(path, view, columns)
+            info["result_rows"] = len(view)
+        os.remove(path)
+    return t.results
+
+
+def best(results):
+    """Минимальное время каждого этапа по всем повторам."""
+    by_key = {}
+    for r in results:
+        key = (r["rows"], r["stage"])
+        if key not in by_key or r["seconds"] < by_key[key]["seconds"]:
+            by_key[key] = r
+    return list(by_key.values())
+
+
+def compare(results, baseline, tolerance):
+    """Этапы, ставшие медленнее baseline больше чем в (1 + tolerance) раз."""
+    old = {(r["rows"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    slower = []
+    for r in results:
+        before = old.get((r["rows"], r["stage"]))
+        # совсем короткие этапы слишком шумные для сравнения
+        if before is None or max(before, r["seconds"]) < 0.01:
+            continue
+        if r["seconds"] > before * (1 + tolerance):
+            slower.append((r["rows"], r["stage"], before, r["seconds"]))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.run")
+    parser.add_argument("--sizes", default="10000,100000,1000000,5000000")
+    parser.add_argument("--repeat", type=int, default=1, help="повторов каждого размера")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--xlsx-max", type=int, default=100000,
+        help="наибольший каталог, для которого замеряются разбор и выгрузка .xlsx",
+    )
+    parser.add_argument("--geodesic", action="store_true", help="с геодезическими координатами")
+    parser.add_argument("--dict", default="dict", help="папка справочников")
+    parser.add_argument(
+        "--workdir", default=os.path.join(tempfile.gettempdir(), "seismicfilter-bench"),
+        help="папка для сгенерированных книг и кэша",
+    )
+    parser.add_argument("--out", help="файл JSON с результатами, по умолчанию stdout")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое замедление")
+    args = parser.parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    for rows in [int(s) for s in args.sizes.split(",")]:
+        for i in range(args.repeat):
+            results.extend(run_size(rows, args))
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "geodesic": args.geodesic,
+        },
+        "results": best(results),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            slower = compare(report["results"], json.load(f), args.tolerance)
+        for rows, stage, before, after in slower:
+            print(
+                "slower: %d rows, %s: %.3f s -> %.3f s" % (rows, stage, before, after),
+                file=sys.stderr,
+            )
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
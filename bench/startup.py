@@ -0,0 +1,97 @@
+"""
+Проверка времени запуска: сколько занимает импорт главного окна.
+
+    python -m bench.startup
+    python -m bench.startup --budget 400 --out startup.json
+
+Модуль (по умолчанию main_window) импортируется в отдельном процессе с
+-X importtime несколько раз, берется лучшее время. Кроме времени проверяется,
+что при импорте не загрузились тяжелые модули (pandas, numpy, watchdog...):
+они должны подгружаться в фоне после показа окна. Результат - JSON с
+временем и самыми долгими импортами; при превышении бюджета или загрузке
+запрещенного модуля программа завершается с кодом 1.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# не должны загружаться до показа окна
+DEFERRED = ["pandas", "numpy", "watchdog", "pyarrow", "openpyxl", "transform", "engine", "workbook"]
+
+# печатает загруженные модули из списка DEFERRED последней строкой вывода
+PROBE = """
+import sys
+import %s
+print(",".join(m for m in %r if m in sys.modules))
+"""
+
+
+def measure(module):
+    """Один запуск: (микросекунды импорта module, загруженные модули из DEFERRED, импорты по времени)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE % (module, DEFERRED)],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError("import %s failed:\n%s" % (module, proc.stderr))
+    lines = proc.stdout.splitlines()
+    loaded = [m for m in lines[-1].split(",") if m] if lines else []
+    # строки вида "import time:      self [us] |  cumulative | imported package"
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative, name = [s.strip() for s in line.replace("import time:", "|", 1).split("|")]
+        imports[name] = int(cumulative)
+    return imports.get(module, 0), loaded, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.startup")
+    parser.add_argument("--module", default="main_window", help="импортируемый модуль")
+    parser.add_argument("--budget", type=float, default=500.0, help="допустимое время импорта, мс")
+    parser.add_argument("--repeat", type=int, default=5, help="запусков, берется лучший")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых долгих импортов показать")
+    parser.add_argument("--out", help="файл JSON с результатами, по умолчанию stdout")
+    args = parser.parse_args(argv)
+
+    best = None
+    for i in range(args.repeat):
+        run = measure(args.module)
+        if best is None or run[0] < best[0]:
+            best = run
+    total_us, loaded, imports = best
+    slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[: args.top]
+    report = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "milliseconds": total_us / 1000,
+        "budget": args.budget,
+        "deferred_loaded": loaded,
+        "slowest": [{"module": name, "milliseconds": us / 1000} for name, us in slowest],
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=1)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    failed = False
+    if report["milliseconds"] > args.budget:
+        print("import %s: %.1f ms > budget %.1f ms" % (args.module, report["milliseconds"], args.budget), file=sys.stderr)
+        failed = True
+    if loaded:
+        print("loaded before the window is shown: %s" % ", ".join(loaded), file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import functools
+import os
+
+import pandas as pd
+
+# Символы, имеющие особый смысл в регулярных выражениях. Экранируем только их,
+# чтобы выражение понимали и модуль re, и RE2 (pyarrow), которым pandas
+# выполняет .str.match для строковых столбцов.
+_SPECIAL = set(".^$*+?()[]{}|\\")
+
+
+def _escape(text):
+    return "".join("\\" + ch if ch in _SPECIAL else ch for ch in text)
+
+
+def _class_body(stuff):
+    """
+    Тело класса символов (вместе с "!") для регулярного выражения. Пустые
+    диапазоны вроде "z-a" (ошибка в re и RE2) выбрасываются так же, как в
+    fnmatch.translate; "!" в начале остается неэкранированным.
+    """
+    # дефис в начале класса (после "!") - обычный символ
+    chunks = []
+    start, k = 0, 2 if stuff.startswith("!") else 1
+    while True:
+        k = stuff.find("-", k)
+        if k < 0:
+            break
+        chunks.append(stuff[start:k])
+        start = k + 1
+        k = k + 3
+    chunk = stuff[start:]
+    if chunk or not chunks:
+        chunks.append(chunk)
+    else:
+        # дефис в конце класса - обычный символ
+        chunks[-1] += "-"
+    for k in range(len(chunks) - 1, 0, -1):
+        if chunks[k - 1][-1] > chunks[k][0]:
+            chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+            del chunks[k]
+    # "&", "~" и "|" подряд re считает будущими операциями над множествами
+    return "-".join(
+        "".join("\\" + ch if ch in "\\[-&~|" else ch for ch in c) for c in chunks
+    )
+
+
+def glob_to_regex(pattern):
+    """Переводит glob-шаблон в регулярное выражение с той же семантикой, что у fnmatch."""
+    res = []
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        i += 1
+        if ch == "*":
+            # подряд идущие звездочки эквивалентны одной
+            if not res or res[-1] != ".*":
+                res.append(".*")
+        elif ch == "?":
+            res.append(".")
+        elif ch == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                res.append("\\[")
+                continue
+            stuff = pattern[i:j]
+            i = j + 1
+            if not stuff:
+                # пустой класс не совпадает ни с чем
+                res.append("[^\\s\\S]")
+                continue
+            # отрицание определяется уже после удаления пустых диапазонов, как в fnmatch
+            stuff = _class_body(stuff)
+            if not stuff:
+                # все диапазоны пустые: класс не совпадает ни с чем
+                res.append("[^\\s\\S]")
+            elif stuff == "!":
+                res.append("[\\s\\S]")
+            elif stuff[0] == "!":
+                res.append("[^%s]" % stuff[1:])
+            elif stuff[0] == "^":
+                res.append("[\\%s]" % stuff)
+            else:
+                res.append("[%s]" % stuff)
+        else:
+            res.append(_escape(ch))
+    return "".join(res)
+
+
+@functools.lru_cache(maxsize=16)
+def compile_blacklist(patterns):
+    """
+    Собирает кортеж glob-шаблонов черного списка в одно заякоренное регулярное
+    выражение. Возвращает строку выражения или None, если список пуст.
+    Результат кэшируется, пока содержимое черного списка не меняется.
+
+    Как и fnmatch.fnmatch, шаблоны нормализуются через os.path.normcase,
+    т.е. в Windows сравнение не зависит от регистра.
+    """
+    patterns = [os.path.normcase(p) for p in patterns if p]
+    if not patterns:
+        return None
+    return "(?s)^(?:%s)$" % "|".join(glob_to_regex(p) for p in patterns)
+
+
+def match_blacklist(series, regex):
+    """Векторно проверяет строки Series на совпадение с выражением из compile_blacklist."""
+    if regex is None:
+        return pd.Series(False, index=series.index)
+    values = series.astype(str)
+    if os.path.normcase("A/") != "A/":
+        values = values.str.lower().str.replace("/", "\\", regex=False)
+    return values.str.match(regex, na=False).astype(bool)
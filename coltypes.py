@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+# Приведение строковых столбцов листа к числам и датам.
+#
+# Столбец переводится в типизированный вид только если его исходный текст
+# однозначно восстанавливается функцией format_column, поэтому для экспорта
+# и отображения всегда доступен тот же текст, что был в книге.
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def is_text(series):
+    return not (
+        pd.api.types.is_numeric_dtype(series.dtype)
+        or pd.api.types.is_datetime64_any_dtype(series.dtype)
+    )
+
+
+def _format_float(values):
+    values = np.asarray(values)
+    text = values.astype(str).astype(object)
+    finite = np.isfinite(values)
+    integral = finite & (values == np.trunc(np.where(finite, values, 0))) & (
+        np.abs(np.where(finite, values, 0)) < 1e15
+    )
+    text[integral] = values[integral].astype(np.int64).astype(str)
+    text[np.isnan(values)] = ""
+    return text
+
+
+def format_column(series):
+    """Возвращает Series строк в том виде, в каком значения были записаны в книге."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # форматируем только словарь и разворачиваем по кодам
+        categories = format_column(pd.Series(series.cat.categories)).to_numpy(dtype=object)
+        categories = np.append(categories, "")
+        return pd.Series(categories[series.cat.codes.to_numpy()], index=series.index)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.dt.strftime(DATETIME_FORMAT).fillna("")
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series.astype(str)
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series.astype(str)
+    if pd.api.types.is_float_dtype(series.dtype):
+        return pd.Series(_format_float(series.to_numpy()), index=series.index)
+    return series.astype(object).fillna("").astype(str)
+
+
+def as_float(series):
+    """Значения столбца в виде массива float64, нечисловой текст и пустые ячейки дают NaN."""
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.to_numeric(format_column(series), errors="coerce").to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+
+
+def sort_order(series):
+    """
+    Устойчивая перестановка строк по возрастанию значений столбца.
+    Пустые значения (NaN, NaT) оказываются в конце, текст сравнивается как строки,
+    у category сортируется только словарь.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = pd.Series(series.cat.categories)
+        rank = np.empty(len(categories) + 1, dtype=np.intp)
+        rank[sort_order(categories)] = np.arange(len(categories))
+        # код -1 (пропуск) ставим в конец
+        rank[-1] = len(categories)
+        return np.argsort(rank[series.cat.codes.to_numpy()], kind="stable")
+    return np.argsort(_sort_key(series), kind="stable")
+
+
+def _sort_key(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # равные значения - равные коды
+        return series.cat.codes.to_numpy()
+    if is_text(series):
+        return format_column(series).to_numpy(dtype=object)
+    return series.to_numpy()
+
+
+def descending_order(series):
+    """
+    Для значений, уже упорядоченных по возрастанию (sort_order), перестановка
+    позиций по убыванию: группы равных значений идут в обратном порядке, внутри
+    группы сохраняется исходный порядок, пустые значения остаются в конце.
+    """
+    # у category пропуск - код -1, а не пустая строка
+    filled = (not_blank(series) & series.notna()).to_numpy()
+    positions = np.flatnonzero(filled)
+    key = _sort_key(series)[positions]
+    starts = np.empty(len(key), dtype=bool)
+    starts[:1] = True
+    starts[1:] = key[1:] != key[:-1]
+    group = np.cumsum(starts)
+    order = positions[np.argsort(-group, kind="stable")]
+    return np.concatenate([order, np.flatnonzero(~filled)])
+
+
+def not_blank(series):
+    """Булева маска непустых значений для столбца любого типа."""
+    if is_text(series):
+        return series != ""
+    return series.notna()
+
+
+def _try_numeric(series, float_dtype):
+    blank = series == ""
+    # быстро отбрасываем явно текстовые столбцы по первым значениям
+    sample = series[~blank].head(100)
+    if pd.to_numeric(sample, errors="coerce").isna().any():
+        return None
+    values = pd.to_numeric(series, errors="coerce")
+    if values[~blank].isna().any() or blank.all():
+        return None
+    values = values.to_numpy(dtype=np.float64)
+    original = series[~blank].to_numpy(dtype=object)
+    if not blank.any() and np.all(values == np.trunc(values)) and np.all(np.abs(values) < 1e15):
+        ints = pd.to_numeric(values.astype(np.int64), downcast="integer")
+        if np.array_equal(ints.astype(str).astype(object), original):
+            return pd.Series(ints, index=series.index)
+    for dtype in dict.fromkeys([float_dtype, np.float64]):
+        typed = values.astype(dtype)
+        if np.array_equal(_format_float(typed[~blank.to_numpy()]), original):
+            return pd.Series(typed, index=series.index)
+    return None
+
+
+def _try_datetime(series):
+    blank = series == ""
+    if blank.all():
+        return None
+    try:
+        values = pd.to_datetime(series.where(~blank), format="ISO8601")
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if values[~blank].isna().any():
+        return None
+    text = values[~blank].dt.strftime(DATETIME_FORMAT)
+    if not np.array_equal(text.to_numpy(dtype=object), series[~blank].to_numpy(dtype=object)):
+        return None
+    return values
+
+
+def convert_typed(df, float_dtype=np.float64):
+    """
+    Переводит строковые столбцы в числа (целые наименьшего размера или float_dtype
+    с NaN для пустых ячеек) и datetime64, если текст столбца восстанавливается
+    без потерь. Остальные столбцы остаются строковыми.
+    """
+    for col in df.columns:
+        s = df[col]
+        if not is_text(s) or isinstance(s.dtype, pd.CategoricalDtype) or len(s) == 0:
+            continue
+        typed = _try_numeric(s, float_dtype)
+        if typed is None:
+            typed = _try_datetime(s)
+        if typed is not None:
+            df[col] = typed
+    return df
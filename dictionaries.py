@@ -0,0 +1,91 @@
+import os
+import threading
+
+
+# (параметр, файл в dict/cols, имена по умолчанию, если файла нет)
+COLUMN_DICTS = [
+    ("x_col", "x.txt", ["EX", "X"]),
+    ("y_col", "y.txt", ["EY", "Y"]),
+    ("z_col", "z.txt", ["EZ", "Z"]),
+    ("value_col", "value.txt", ["EEnergy", "Energy"]),
+    ("date_col", "time.txt", ["ELocTime"]),
+    ("type_id_col", "type_id.txt", ["ETypeId", "TypeId"]),
+    ("comment_col", "comment.txt", ["EComment", "Comment"]),
+    ("filename_col", "source_filename.txt", ["ESourseFileName", "ESourceFileName", "SourceFileName"]),
+]
+
+# Критерии фильтра (имена масок MaskCache), зависящие от файла справочника.
+DEPENDENT_CRITERIA = {
+    "blacklist/kir.txt": ("kir_blacklist",),
+    "blacklist/ras.txt": ("ras_blacklist",),
+}
+
+
+class DictRegistry:
+    """
+    Справочники из папки dict, прочитанные один раз.
+
+    Каждый файл читается при первом обращении и хранится в разобранном виде
+    (кортеж непустых строк), для черных списков заодно компилируется шаблон
+    (blacklist.compile_blacklist). После изменения файла на диске его запись
+    сбрасывается методом invalidate и перечитывается при следующем обращении.
+    """
+
+    def __init__(self, dict_dir="dict"):
+        self.dict_dir = dict_dir
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def name(self, path):
+        """Имя справочника ("cols/x.txt") для пути к файлу или None, если файл не из dict_dir."""
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.dict_dir))
+        if rel.startswith(os.pardir):
+            return None
+        return rel.replace(os.sep, "/")
+
+    def lines(self, name):
+        """Непустые строки справочника name, None если файла нет."""
+        with self.lock:
+            if name in self.entries:
+                return self.entries[name]
+        path = os.path.join(self.dict_dir, *name.split("/"))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = tuple(line.strip() for line in f if line.strip())
+        except (FileNotFoundError, PermissionError, IOError) as e:
+            print("cannot load file %s, %s" % (path, e))
+            lines = None
+        with self.lock:
+            self.entries[name] = lines
+        return lines
+
+    def blacklists(self):
+        """Шаблоны черных списков комментариев (kir, ras)."""
+        # blacklist тянет pandas, импортируем его только когда нужны шаблоны
+        from blacklist import compile_blacklist
+
+        kir = self.lines("blacklist/kir.txt") or ()
+        ras = self.lines("blacklist/ras.txt") or ()
+        # компиляция кэшируется в compile_blacklist, фильтр получит готовые шаблоны
+        compile_blacklist(kir)
+        compile_blacklist(ras)
+        return kir, ras
+
+    def column_names(self):
+        """Словарь параметр ColumnMapping -> возможные имена столбца из dict/cols."""
+        names = {}
+        for key, filename, fallback in COLUMN_DICTS:
+            lines = self.lines("cols/" + filename)
+            names[key] = tuple(fallback) if lines is None else lines
+        return names
+
+    def invalidate(self, path):
+        """
+        Сбрасывает справочник, соответствующий файлу path. Возвращает его имя
+        (None, если файл не из папки справочников).
+        """
+        name = self.name(path)
+        if name is not None:
+            with self.lock:
+                self.entries.pop(name, None)
+        return name
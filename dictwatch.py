@@ -0,0 +1,116 @@
+import os
+import threading
+
+from watchdog.events import (
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEventHandler,
+)
+from watchdog.observers import Observer
+
+from sheetcache import file_hash
+
+
+class FileChangeHandler(FileSystemEventHandler):
+    """
+    Следит за файлами справочников и сообщает о реально изменившихся.
+
+    Редакторы часто сохраняют файл несколькими записями, поэтому события
+    копятся, пока в течение quiet секунд не придет новых, и затем передаются
+    одним вызовом callback(paths). Файлы с прежними размером и временем
+    изменения считаются неизменными без чтения; остальные хэшируются, и если
+    размер и хэш совпали с прежними (файл пересохранили без изменений), о нем
+    не сообщается. Начальный снимок папки строится в фоновом потоке и не
+    задерживает запуск.
+    """
+
+    def __init__(self, dirname, callback, quiet=0.5):
+        super().__init__()
+        self.dirname = dirname
+        self.callback = callback
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        # путь -> (размер, mtime_ns, хэш содержимого)
+        self.known = {}
+        self.pending = set()
+        self.timer = None
+        threading.Thread(target=self._snapshot, daemon=True).start()
+
+    def _snapshot(self):
+        for root, _, files in os.walk(self.dirname):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    st = os.stat(path)
+                    digest = file_hash(path)
+                except OSError:
+                    continue
+                with self.lock:
+                    # событие могло успеть обновить запись раньше
+                    self.known.setdefault(path, (st.st_size, st.st_mtime_ns, digest))
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        if isinstance(event, FileMovedEvent):
+            # сохранение через временный файл и переименование
+            self._touch(event.dest_path)
+        self._touch(event.src_path)
+
+    def _touch(self, path):
+        with self.lock:
+            self.pending.add(path)
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.quiet, self._flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _flush(self):
+        with self.lock:
+            paths = self.pending
+            self.pending = set()
+            self.timer = None
+        changed = sorted(path for path in paths if self._changed(path))
+        if changed:
+            print("dictionaries changed:", changed)
+            self.callback(changed)
+
+    def _changed(self, path):
+        with self.lock:
+            old = self.known.get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            # файл удален: изменился, если мы о нем знали
+            with self.lock:
+                self.known.pop(path, None)
+            return old is not None
+        if old is not None and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+            return False
+        try:
+            digest = file_hash(path)
+        except OSError:
+            return False
+        with self.lock:
+            self.known[path] = (st.st_size, st.st_mtime_ns, digest)
+        if old is not None and old[0] == st.st_size:
+            return digest != old[2]
+        return True
+
+
+def watch(dirname, callback, quiet=0.5):
+    """Запускает наблюдение за папкой dirname (рекурсивно), возвращает Observer."""
+    handler = FileChangeHandler(dirname, callback, quiet)
+    observer = Observer()
+    observer.schedule(
+        handler,
+        dirname,
+        recursive=True,
+        event_filter=[FileModifiedEvent, FileCreatedEvent, FileDeletedEvent, FileMovedEvent],
+    )
+    observer.daemon = True
+    observer.start()
+    return observer
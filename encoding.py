@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# Комментарии, имена исходных файлов и типы событий в выгрузках АСКСМ сильно
+# повторяются, поэтому такие столбцы храним в виде category (коды + словарь
+# уникальных значений), а строковые проверки выполняем только над словарем.
+
+
+def encode_repeated(df, max_ratio=0.5):
+    """
+    Переводит в category столбцы, в которых уникальных значений не больше
+    max_ratio от числа строк. Уже закодированные столбцы не трогает.
+    """
+    for col in df.columns:
+        s = df[col]
+        if len(s) == 0 or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        if s.dtype != object and not pd.api.types.is_string_dtype(s.dtype):
+            continue
+        codes, uniques = pd.factorize(s)
+        if len(uniques) <= len(s) * max_ratio:
+            df[col] = pd.Categorical.from_codes(codes, uniques)
+    return df
+
+
+def factorize(series):
+    """Возвращает (коды, Series уникальных значений) для столбца любого типа."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), pd.Series(series.cat.categories)
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Series(uniques)
+
+
+def map_unique(series, func):
+    """
+    Вычисляет булев предикат func только над уникальными значениями столбца
+    и разворачивает результат на все строки через коды.
+
+    :param func: принимает Series уникальных значений, возвращает булев массив той же длины
+    """
+    codes, uniques = factorize(series)
+    result = np.asarray(func(uniques), dtype=bool)
+    # код -1 означает пропуск, для него предикат ложен
+    result = np.append(result, False)
+    return pd.Series(result[codes], index=series.index)
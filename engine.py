@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from blacklist import compile_blacklist, match_blacklist
+from coltypes import format_column, not_blank
+from encoding import map_unique
+from maskcache import MaskCache
+from mines import KIR, RAS, mine_codes, mine_order
+from perf import span, timed
+from resultview import ResultView
+
+# Фильтр событий без привязки к интерфейсу: им пользуются главное окно,
+# выгрузка и пакетный режим (batch.py). Все входные данные фильтра
+# передаются одним неизменяемым FilterSpec, поэтому его можно сравнивать
+# и использовать как ключ.
+
+
+@dataclass(frozen=True)
+class ColumnMapping:
+    """Какие столбцы листа содержат поля события."""
+
+    x_col: str
+    y_col: str
+    z_col: str
+    value_col: str
+    date_col: str
+    type_id_col: str
+    comment_col: str
+    filename_col: str
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    Параметры фильтра: столбцы, отмеченные типы событий (в текстовом виде,
+    как в книге), рудники (mines.KIR, mines.RAS) и черные списки комментариев.
+    """
+
+    columns: ColumnMapping
+    types: Tuple[str, ...] = ()
+    mines: Tuple[int, ...] = (KIR,)
+    kir_blacklist: Tuple[str, ...] = ()
+    ras_blacklist: Tuple[str, ...] = ()
+
+
+def suggest_column(header, names):
+    """Первый столбец header, имя которого есть в names, или None."""
+    for item in header:
+        if item.strip() in names:
+            return item
+    return None
+
+
+def suggest_mapping(header, column_names):
+    """
+    Столбцы листа по возможным именам (DictRegistry.column_names): словарь
+    параметр -> имя столбца (или None).
+    """
+    return {key: suggest_column(header, names) for key, names in column_names.items()}
+
+
+def filter_rows(df, spec, masks=None, cancelled=None):
+    """
+    Фильтрует события листа df по FilterSpec. Маски отдельных критериев
+    берутся из masks (MaskCache листа), так что пересчитываются только
+    критерии, чьи входные данные изменились.
+
+    Строки не копируются: возвращается массив позиций отобранных строк df
+    в порядке показа (см. ResultView).
+
+    :param cancelled: функция без аргументов; если она вернула True между
+        критериями, фильтрация прерывается и возвращается None
+    """
+    if masks is None:
+        masks = MaskCache()
+    x_col = spec.columns.x_col
+    y_col = spec.columns.y_col
+    z_col = spec.columns.z_col
+    value_col = spec.columns.value_col
+    comment_col = spec.columns.comment_col
+    type_id_col = spec.columns.type_id_col
+    filename_col = spec.columns.filename_col
+    selected_types = spec.types
+    mines = spec.mines
+    sort_by_field = True
+
+    kir_regex = compile_blacklist(spec.kir_blacklist)
+    ras_regex = compile_blacklist(spec.ras_blacklist)
+
+    # коды рудников и порядок группировки по ним считаются один раз на лист
+    codes = masks.get(
+        "mine_codes",
+        (filename_col,),
+        lambda: mine_codes(df[filename_col]),
+        dtype=np.int8,
+    )
+    order = masks.get(
+        "mine_order", (filename_col,), lambda: mine_order(codes), dtype=np.intp
+    )
+
+    def blacklist_mask(mine, regex):
+        return (codes != mine) | ~map_unique(
+            df[comment_col],
+            lambda u: match_blacklist(format_column(u).str.strip(), regex),
+        )
+
+    criteria = [
+        ("x", (x_col,), lambda: not_blank(df[x_col])),
+        ("y", (y_col,), lambda: not_blank(df[y_col])),
+        ("z", (z_col,), lambda: not_blank(df[z_col])),
+        ("value", (value_col,), lambda: not_blank(df[value_col])),
+        (
+            "types",
+            (type_id_col, selected_types),
+            lambda: map_unique(
+                df[type_id_col],
+                lambda u: format_column(u).isin(selected_types),
+            ),
+        ),
+        ("mine", (filename_col, mines), lambda: np.isin(codes, mines)),
+        (
+            "kir_blacklist",
+            (filename_col, comment_col, kir_regex),
+            lambda: blacklist_mask(KIR, kir_regex),
+        ),
+        (
+            "ras_blacklist",
+            (filename_col, comment_col, ras_regex),
+            lambda: blacklist_mask(RAS, ras_regex),
+        ),
+    ]
+    with span("filter", len(df)) as info:
+        mask = np.ones(len(df), dtype=bool)
+        for name, key, compute in criteria:
+            if cancelled is not None and cancelled():
+                return None
+            # замеряется только пересчет критерия, попадания в кэш мгновенны
+            mask &= masks.get(
+                name, key, lambda name=name, compute=compute: timed("filter." + name, compute, len(df))
+            )
+        if sort_by_field:
+            rows = order[mask[order]]
+        else:
+            rows = np.flatnonzero(mask)
+        info["rows"] = len(rows)
+    return rows
+
+
+def select(data, spec, geodesic=False, cancelled=None):
+    """
+    Фильтрует разобранный лист (workbook.SheetData) и возвращает ResultView
+    с его столбцами и, если geodesic, геодезическими координатами. Представление
+    можно сортировать (SheetData.sort_order). None, если фильтр прерван.
+    """
+    extra = None
+    if geodesic:
+        c = spec.columns
+        extra = data.geodesic(c.x_col, c.y_col, c.z_col)
+    rows = filter_rows(data.df, spec, data.masks, cancelled)
+    if rows is None:
+        return None
+    return ResultView.from_frames(rows, data.df, extra, order=data.sort_order)
@@ -0,0 +1,178 @@
+import csv
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from perf import span
+from transform import GEO_COLUMNS
+
+# Выгрузка результата фильтрации (ResultView) в файл.
+#
+# Строки форматируются и записываются порциями по CHUNK_ROWS, поэтому память
+# не зависит от размера выборки, а между порциями обновляется прогресс и
+# проверяется отмена.
+
+CHUNK_ROWS = 10000
+
+# столбцы, в которых десятичная точка заменяется на запятую
+DECIMAL_COMMA_COLUMNS = ("Energy",)
+
+# (описание для диалога сохранения, расширение)
+FORMATS = [
+    ("Excel файлы (*.xlsx)", ".xlsx"),
+    ("CSV (*.csv)", ".csv"),
+    ("TSV (*.tsv)", ".tsv"),
+    ("Parquet (*.parquet)", ".parquet"),
+]
+
+
+def wildcard():
+    return "|".join("%s|*%s" % (label, ext) for label, ext in FORMATS)
+
+
+def export_columns(mapping, geodesic=False):
+    """Список (код столбца листа, имя столбца в файле) для выгрузки по engine.ColumnMapping."""
+    columns = [
+        (mapping.type_id_col, "TypeId"),
+        (mapping.x_col, "X"),
+        (mapping.y_col, "Y"),
+        (mapping.z_col, "Z"),
+        (mapping.value_col, "Energy"),
+        (mapping.date_col, "LocTime"),
+    ]
+    if geodesic:
+        columns += list(zip(GEO_COLUMNS, ["GX", "GY", "GZ"]))
+    return columns
+
+
+def iter_chunks(view, columns, decimal_comma=True, chunk_rows=CHUNK_ROWS):
+    """
+    Перебирает строки view порциями: (число строк, список массивов строк по столбцам columns).
+    Числа и даты выгружаются в исходном текстовом виде.
+    """
+    for start in range(0, len(view), chunk_rows):
+        stop = min(start + chunk_rows, len(view))
+        chunk = []
+        for code, name in columns:
+            text = view.text(code, start, stop)
+            if decimal_comma and name in DECIMAL_COMMA_COLUMNS:
+                text = np.char.replace(text.astype(str), ".", ",").astype(object)
+            chunk.append(text)
+        yield stop - start, chunk
+
+
+def write_xlsx(path, view, columns, decimal_comma=True, progress=None, cancelled=None):
+    """
+    Записывает view в .xlsx потоковым писателем openpyxl (write_only).
+
+    :param progress: progress(записано строк, всего строк)
+    :param cancelled: функция без аргументов, True - прервать запись
+    :return: False, если запись отменена (файл при этом не создается)
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append([name for code, name in columns])
+    written = 0
+    for count, chunk in iter_chunks(view, columns, decimal_comma):
+        if cancelled is not None and cancelled():
+            # лист пишется во временный файл openpyxl, сам .xlsx создается только в save
+            ws.close()
+            return False
+        for row in zip(*chunk):
+            ws.append(row)
+        written += count
+        if progress is not None:
+            progress(written, len(view))
+    wb.save(path)
+    return True
+
+
+def write_csv(path, view, columns, delimiter=None, decimal_comma=True, progress=None, cancelled=None):
+    """
+    Записывает view в CSV/TSV порциями. По умолчанию разделитель - табуляция
+    для .tsv, для .csv - ";" при десятичной запятой и "," без нее.
+    Файл в UTF-8 с BOM, чтобы Excel правильно открывал кириллицу.
+    При отмене недописанный файл удаляется.
+    """
+    if delimiter is None:
+        if path.lower().endswith(".tsv"):
+            delimiter = "\t"
+        else:
+            delimiter = ";" if decimal_comma else ","
+    written = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow([name for code, name in columns])
+        for count, chunk in iter_chunks(view, columns, decimal_comma):
+            if cancelled is not None and cancelled():
+                break
+            writer.writerows(zip(*chunk))
+            written += count
+            if progress is not None:
+                progress(written, len(view))
+        else:
+            return True
+    os.remove(path)
+    return False
+
+
+def write_parquet(path, view, columns, progress=None, cancelled=None):
+    """
+    Записывает view в Parquet порциями (pyarrow.parquet.ParquetWriter).
+    В отличие от текстовых форматов значения сохраняются с их типами
+    (числа, даты, словарные столбцы), десятичная запятая не применяется.
+    При отмене недописанный файл удаляется.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для сохранения в Parquet нужен пакет pyarrow")
+
+    writer = None
+    written = 0
+    try:
+        # хотя бы одна порция, чтобы у пустой выборки была схема
+        for start in range(0, max(len(view), 1), CHUNK_ROWS):
+            if cancelled is not None and cancelled():
+                break
+            stop = min(start + CHUNK_ROWS, len(view))
+            df = pd.DataFrame(
+                {
+                    name: view.values(code, start, stop).reset_index(drop=True)
+                    for code, name in columns
+                }
+            )
+            schema = writer.schema if writer is not None else None
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            written += stop - start
+            if progress is not None:
+                progress(written, len(view))
+        else:
+            return True
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.remove(path)
+    return False
+
+
+def write(path, view, columns, decimal_comma=True, progress=None, cancelled=None):
+    """Записывает view в формате, определяемом расширением path (см. FORMATS)."""
+    ext = os.path.splitext(path)[1].lower()
+    with span("export" + ext, len(view)):
+        if ext in (".csv", ".tsv"):
+            return write_csv(
+                path, view, columns, decimal_comma=decimal_comma, progress=progress, cancelled=cancelled
+            )
+        if ext == ".parquet":
+            return write_parquet(path, view, columns, progress=progress, cancelled=cancelled)
+        return write_xlsx(
+            path, view, columns, decimal_comma=decimal_comma, progress=progress, cancelled=cancelled
+        )
@@ -0,0 +1,79 @@
+import threading
+import time
+import traceback
+
+import wx
+
+
+class FilterWorker:
+    """
+    Выполняет фильтрацию в отдельном фоновом потоке.
+
+    Каждый вызов submit увеличивает номер поколения. Задача запускается только
+    после того, как в течение delay секунд не пришло новых запросов, а уже
+    выполняющаяся задача видит через cancelled(), что ее результат устарел, и
+    может прерваться. В поток интерфейса через wx.CallAfter передается только
+    результат последнего запроса.
+    """
+
+    def __init__(self, callback, delay=0.15):
+        self.callback = callback
+        self.delay = delay
+        self.generation = 0
+        self.pending = None
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, func):
+        """
+        Ставит задачу в очередь, вытесняя предыдущие.
+
+        :param func: вызывается в фоне как func(cancelled), где cancelled - функция
+            без аргументов, возвращающая True, если появился более новый запрос
+        """
+        with self.cond:
+            self.generation += 1
+            self.pending = (self.generation, func, time.monotonic())
+            self.cond.notify()
+
+    def cancel(self):
+        """Отменяет ожидающую и выполняющуюся задачи."""
+        with self.cond:
+            self.generation += 1
+            self.pending = None
+            self.cond.notify()
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def _next(self):
+        with self.cond:
+            while True:
+                if self.pending is None:
+                    self.cond.wait()
+                    continue
+                generation, func, submitted = self.pending
+                remaining = submitted + self.delay - time.monotonic()
+                if remaining > 0:
+                    # ждем тишины: новые запросы продлевают ожидание
+                    self.cond.wait(remaining)
+                    continue
+                self.pending = None
+                return generation, func
+
+    def _loop(self):
+        while True:
+            generation, func = self._next()
+            try:
+                result = func(lambda: not self.is_current(generation))
+            except Exception as e:
+                tb = traceback.format_exc()
+                wx.CallAfter(wx.LogError, f"Exception caught:\n{e}\nTraceback:\n{tb}")
+                continue
+            if self.is_current(generation):
+                wx.CallAfter(self._deliver, generation, result)
+
+    def _deliver(self, generation, result):
+        if self.is_current(generation) and result is not None:
+            self.callback(result)
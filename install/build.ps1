@@ -1 +1 @@
-pyinstaller  --onefile --windowed --clean --exclude-module=tkinter --exclude-module=sqlalchemy --exclude-module=matplotlib --exclude-module=psycopg2 --exclude-module=scipy --exclude-module=PIL --exclude-module=pytest --exclude-module=unittest --exclude-module=distutils --exclude-module=_test  --name seismicfilter --collect-all=watchdog --hidden-import=openpyxl --workpath=build --distpath=dist --optimize=2 main.py
\ No newline at end of file
+pyinstaller  --onefile --windowed --clean --exclude-module=tkinter --exclude-module=sqlalchemy --exclude-module=matplotlib --exclude-module=psycopg2 --exclude-module=scipy --exclude-module=PIL --exclude-module=pytest --exclude-module=unittest --exclude-module=distutils --exclude-module=_test  --name seismicfilter --collect-all=watchdog --hidden-import=openpyxl --hidden-import=coltypes --hidden-import=dictionaries --hidden-import=engine --hidden-import=export --hidden-import=mines --hidden-import=resultview --hidden-import=sheetcache --hidden-import=sheetreader --hidden-import=transform --hidden-import=workbook --workpath=build --distpath=dist --optimize=2 main.py
\ No newline at end of file
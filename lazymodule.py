@@ -0,0 +1,39 @@
+import importlib
+import threading
+import types
+
+# Отложенный импорт тяжелых модулей (pandas, numpy и зависящих от них).
+#
+# lazy(name) возвращает заместитель, который импортирует настоящий модуль при
+# первом обращении к его атрибуту. Это позволяет показать окно до загрузки
+# pandas, а preload подгружает модули в фоне, пока пользователь выбирает файл.
+
+
+class LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self.__name__), attr)
+
+
+def lazy(name):
+    return LazyModule(name)
+
+
+def preload(names, then=None):
+    """
+    Импортирует модули names в фоновом потоке, затем вызывает then() (тоже в фоне).
+    Ошибки импорта печатаются и не мешают запуску: модуль будет загружен
+    (и ошибка повторится) при первом обращении.
+    """
+
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print("cannot preload %s, %s" % (name, e))
+        if then is not None:
+            then()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
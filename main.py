@@ -1,76 +1,39 @@
 import os
 import sys
-import wx
-import time
-import hashlib
+import multiprocessing
 
-import resourcelocation
-from main_window import MainWindow
+# wx и окно импортируются только для графического режима: пакетный режим
+# работает без дисплея, а процессы его пула заново импортируют этот модуль.
 
-if __name__ == "__main__":
-    app = wx.App(0)
-    f = MainWindow()
-    app.SetTopWindow(f)
-    f.Show()
-    from watchdog.observers import Observer
-    from watchdog.events import FileSystemEventHandler, FileModifiedEvent
+# модули, загружаемые в фоне после показа окна (тяжелые зависимости и код на их основе)
+PRELOAD = [
+    "numpy",
+    "pandas",
+    "coltypes",
+    "resultview",
+    "engine",
+    "transform",
+    "sheetreader",
+    "workbook",
+    "export",
+]
 
-    def sha256_file(path):
-        h = hashlib.sha256()
-        with open(path, "rb") as f:
-            while chunk := f.read(8192):
-                h.update(chunk)
-        return h.hexdigest()
-
-    class FileChangeHandler(FileSystemEventHandler):
-        def __init__(self, dirname):
-            super().__init__()
-            self.last_time = 0
-            self.file_hashes = {}
-            self.dirname = dirname
-            for root, _, files in os.walk(dirname):
-                for file in files:
-                    path = os.path.join(root, file)
-                    self.file_hashes[path] = sha256_file(path)
-
-        def on_modified(self, event):
-            self.last_time = 0
-            if event.is_directory:
-                return
-            print("File modified:", event.src_path)
-            now = time.time()
-            if now - self.last_time > 0.5:  # 0.5 секунды "тишины"
-                print(f"Modified once: {event.src_path}")
-            self.last_time = now
-
-            path = event.src_path
-            if not os.path.exists(path):
-                return
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if sys.argv[1:2] == ["--batch"]:
+        import batch
 
-            new_hash = sha256_file(path)
-            old_hash = self.file_hashes.get(path)
+        sys.exit(batch.main(sys.argv[2:]))
 
-            if new_hash != old_hash:
-                self.file_hashes[path] = new_hash
-                print(f"{path} реально изменился")
-            else:
-                print(f"{path} не изменился")
-                return
+    import wx
 
-            if (
-                event.src_path.endswith("x.txt") # type: ignore
-                or event.src_path.endswith("y.txt") # type: ignore
-                or event.src_path.endswith("z.txt") # type: ignore
-                or event.src_path.endswith("time.txt") # type: ignore
-                or event.src_path.endswith("source_filename.txt") # type: ignore
-                or event.src_path.endswith("type_id.txt") # type: ignore
-                or event.src_path.endswith("value.txt") # type: ignore
-                or event.src_path.endswith("comment.txt") # type: ignore
-            ):
-                print("Reloading grid columns...")
-                f.suggest_columns()
-            f.render_grid()
+    import resourcelocation
+    from main_window import MainWindow
 
+    app = wx.App(0)
+    f = MainWindow()
+    app.SetTopWindow(f)
+    f.Show()
     if hasattr(sys, 'frozen'):
         os.chdir(os.path.dirname(sys.executable))
     if getattr(sys, 'frozen', False):
@@ -82,12 +45,22 @@ if __name__ == "__main__":
 
     dict_path = os.path.join(exe_dir, "dict")  # ваш файл dict рядом с exe
 
-    # проверка
-    if os.path.exists(dict_path):
-        event_handler = FileChangeHandler(dict_path)
-        observer = Observer()
-        observer.schedule(
-            event_handler, dict_path, recursive=True, event_filter=[FileModifiedEvent]
-        )  # следим за текущей папкой
-        observer.start()
+    def warm_up():
+        # в фоне после показа окна: матрица пересчета координат и наблюдение
+        # за справочниками (watchdog тоже не нужен до появления окна)
+        import transform
+
+        transform.asksm_geod()
+        if os.path.exists(dict_path):
+            import dictwatch
+
+            # изменения за одну серию сохранений приходят одним списком в поток интерфейса
+            f.dict_observer = dictwatch.watch(
+                dict_path, lambda paths: wx.CallAfter(f.on_dicts_changed, paths)
+            )
+
+    from lazymodule import preload
+
+    # пока пользователь выбирает файл, подгружаем то, что понадобится для чтения и фильтра
+    preload(PRELOAD, then=warm_up)
     app.MainLoop()
@@ -1,109 +1,47 @@
 import wx
-import pandas as pd
-import fnmatch
+from filterworker import FilterWorker
+from lazymodule import lazy
 from menu import MainMenu
 from statusbar import MainStatusBar
-from widgets.task import Task, TaskJob
-import wx.lib.mixins.listctrl as listmix
-import numpy as np
+from widgets.task import HIGH, NORMAL, TaskJob, TaskPanel, TaskScheduler
+import time
+from collections import OrderedDict
 import traceback
 
-import logging
-
-
-class MemoryHandler(logging.Handler):
-    def __init__(self):
-        super().__init__()
-        self.records = []
-
-    def emit(self, record):
-        self.records.append(self.format(record))
-
-    def get_logs(self):
-        return self.records
-
-
-logger = logging.getLogger("runtime")
-logger.setLevel(logging.DEBUG)
-
-memory_handler = MemoryHandler()
-formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-memory_handler.setFormatter(formatter)
-logger.addHandler(memory_handler)
-
-# Считаем матрицу трансформации из системы АСКСМ в геодезическую
-G1 = [29929.634, 40713.921, 349.0]
-G2 = [30113.916, 40479.346, 379.0]
-G3 = [29970.552, 40564.192, 225.0]
-A1 = [3261.0, 1156.0, 97.0]
-A2 = [2993.0, 1025.0, 127.0]
-A3 = [3159.0, 1039.0, -27.0]
-source = np.array([A1, A2, A3])
-target = np.array([G1, G2, G3])
-
-
-def calculate_transformation_matrix(source, target):
-    """
-    Вычисляет матрицу преобразования 4x4 между системами координат
-    по трем парам точек.
-
-    :param source: Исходные точки (3x3 numpy array)
-    :param target: Целевые точки (3x3 numpy array)
-    :return: Матрица преобразования 4x4
-    """
-    # Центрирование точек
-    src_centroid = np.mean(source, axis=0)
-    tgt_centroid = np.mean(target, axis=0)
-
-    src_centered = source - src_centroid
-    tgt_centered = target - tgt_centroid
-
-    # Вычисление матрицы H
-    H = np.dot(src_centered.T, tgt_centered)
-
-    # SVD разложение
-    U, _, Vt = np.linalg.svd(H)
-
-    # Матрица вращения
-    R = np.dot(Vt.T, U.T)
-
-    # Коррекция отражений
-    if np.linalg.det(R) < 0:
-        Vt[-1, :] *= -1
-        R = np.dot(Vt.T, U.T)
-
-    # Вектор трансляции
-    t = tgt_centroid - np.dot(R, src_centroid)
-
-    # Формирование матрицы 4x4
-    matrix = np.eye(4)
-    matrix[:3, :3] = R
-    matrix[:3, 3] = t
-
-    return matrix
-
-
-ASKSM_GEOD = calculate_transformation_matrix(source, target)
-
-
-def calc_asksm_to_geodesic(x, y, z):
-    global ASKSM_GEOD
-    x = float(x)
-    y = float(y)
-    z = float(z)
-    gx, gy, gz = np.dot(ASKSM_GEOD, np.array([x, y, z, 1]))[:3]
-    return gx, gy, gz
-
+from perf import memory_handler, span
+from widgets.diagnostics import DiagnosticsDialog
+
+# pandas, numpy и модули на их основе загружаются при первом обращении
+# (или заранее в фоне, см. main.py), чтобы окно появлялось сразу
+pd = lazy("pandas")
+coltypes = lazy("coltypes")
+dictionaries = lazy("dictionaries")
+engine = lazy("engine")
+export = lazy("export")
+mines = lazy("mines")
+resultview = lazy("resultview")
+sheetcache = lazy("sheetcache")
+transform = lazy("transform")
+workbook = lazy("workbook")
 
 class VirtualListCtrl(wx.ListCtrl):
+    # строки форматируются окнами по WINDOW штук, последние MAX_WINDOWS окон кэшируются
+    WINDOW = 256
+    MAX_WINDOWS = 64
+
     def __init__(self, parent):
         super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
-        self.transform_cache = {}
-        self.df = None
+        # результат в исходном порядке (по рудникам), от него считается сортировка;
+        # None до первого результата, чтобы не загружать pandas при создании окна
+        self.view = self.unsorted = None
+        # (код столбца, по убыванию) или None
+        self.sort = None
+        self.windows = OrderedDict()
         self.header = [""]
         self.SetItemCount(0)
         self.Bind(wx.EVT_KEY_DOWN, self.on_key)
         self.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, self.on_right_click)
+        self.Bind(wx.EVT_LIST_COL_CLICK, self.on_col_click)
         self.current_row = None
         self.current_col = None
         self.x_col = -1
@@ -153,14 +91,51 @@ class VirtualListCtrl(wx.ListCtrl):
                 return col
         return 0
 
-    def update(self, df, header, x_col=-1, y_col=-1, z_col=-1):
-        self.df = df
+    def on_col_click(self, event):
+        # по возрастанию -> по убыванию -> исходный порядок
+        col = event.GetColumn()
+        if self.unsorted is None or col < 0 or col >= len(self.header) or not self.unsorted.can_sort():
+            return
+        code = self.header[col][0]
+        if self.sort is None or self.sort[0] != code:
+            self.sort = (code, False)
+        elif not self.sort[1]:
+            self.sort = (code, True)
+        else:
+            self.sort = None
+        self.set_rows(self.unsorted)
+        self.show_sort_indicator()
+
+    def sorted_view(self, view):
+        if self.sort is None or not view.can_sort():
+            return view
+        code, descending = self.sort
+        if code not in view.columns:
+            self.sort = None
+            return view
+        return view.sorted(code, descending)
+
+    def show_sort_indicator(self):
+        if not hasattr(self, "ShowSortIndicator"):
+            # стрелка в заголовке появилась в wxPython 4.2
+            return
+        codes = [code for code, name in self.header]
+        if self.sort is None or self.sort[0] not in codes:
+            self.RemoveSortIndicator()
+        else:
+            self.ShowSortIndicator(codes.index(self.sort[0]), not self.sort[1])
+
+    def update(self, view, header, x_col=-1, y_col=-1, z_col=-1):
+        """Показывает строки результата фильтрации view (ResultView)."""
         self.header = header
-        self.SetItemCount(len(df))
+        self.unsorted = view
+        self.view = self.sorted_view(view)
+        self.windows = OrderedDict()
+        self.SetItemCount(len(self.view))
         self.DeleteAllColumns()
-        self.transform_cache = {}
         for i, (code, name) in enumerate(header):
             self.InsertColumn(i, name)
+        self.show_sort_indicator()
 
         self.x_col = x_col
         self.y_col = y_col
@@ -169,8 +144,67 @@ class VirtualListCtrl(wx.ListCtrl):
             print("X, Y, Z columns must be selected")
         self.Refresh()
 
+    def set_rows(self, view):
+        """Заменяет строки, не пересоздавая столбцы (используется при догрузке данных и сортировке)."""
+        self.unsorted = view
+        self.view = self.sorted_view(view)
+        self.windows = OrderedDict()
+        self.SetItemCount(len(self.view))
+        self.Refresh()
+
+    def get_window(self, index):
+        """Отформатированные строки окна index: список массивов строк по столбцам header."""
+        window = self.windows.get(index)
+        if window is None:
+            start = index * self.WINDOW
+            stop = start + self.WINDOW
+            window = [self.view.text(code, start, stop) for code, name in self.header]
+            self.windows[index] = window
+            if len(self.windows) > self.MAX_WINDOWS:
+                self.windows.popitem(last=False)
+        else:
+            self.windows.move_to_end(index)
+        return window
+
     def OnGetItemText(self, item, col):
-        return self.df.loc[item, self.header[col][0]]
+        return self.get_window(item // self.WINDOW)[col][item % self.WINDOW]
+
+
+class SheetLoadJob(TaskJob):
+    def __init__(self, workbook, sheet_name, on_chunk=None):
+        super().__init__()
+        self.workbook = workbook
+        self.sheet_name = sheet_name
+        self.on_chunk = on_chunk
+
+    def run(self):
+        data = self.workbook.cached(self.sheet_name)
+        if data is not None:
+            return data
+
+        def progress(read, total):
+            if total < 0:
+                # размер листа неизвестен, панель задач покажет бегущий индикатор
+                self.set_progress(-1, -1, "Прочитано строк: %d" % read)
+            else:
+                self.set_progress(
+                    read, total, "Прочитано строк: %d из %d" % (read, total)
+                )
+
+        def chunk(df):
+            if self.on_chunk is not None:
+                wx.CallAfter(self.on_chunk, self, df)
+
+        df = self.workbook.read(
+            self.sheet_name,
+            progress=progress,
+            cancelled=self.cancel_event.is_set,
+            on_chunk=chunk,
+        )
+        if df is None:
+            return None
+        self.set_progress(message="Сохранение в кэш...")
+        return self.workbook.add(self.sheet_name, df)
 
 
 class SaveExcelJob(TaskJob):
@@ -178,40 +212,42 @@ class SaveExcelJob(TaskJob):
         super().__init__()
         self.main_window = main_window
         self.save_as = save_as
+        # параметры снимаются с виджетов здесь, в потоке интерфейса
+        p = main_window
+        self.spec = p.filter_spec()
+        self.geodesic = p.geodesic_field.IsChecked()
+        self.decimal_comma = p.decimal_comma_field.IsChecked()
+        self.xls_list = p.excell_list_field.GetStrings()[
+            p.excell_list_field.GetSelection()
+        ]
+        # пока идет выгрузка, в окне могут открыть другую книгу
+        self.workbook = p.workbook
+        self.columns = export.export_columns(self.spec.columns, self.geodesic)
+        # если таблица уже показывает результат с этими параметрами, выгружаем его
+        self.view = p.displayed_result(self.xls_list, self.spec, self.geodesic)
 
     def run(self):
         try:
-            p = self.main_window
-            date_col = p.date_field.GetStrings()[p.date_field.GetSelection()]
-            x_col = p.x_field.GetStrings()[p.x_field.GetSelection()]
-            y_col = p.y_field.GetStrings()[p.y_field.GetSelection()]
-            z_col = p.z_field.GetStrings()[p.z_field.GetSelection()]
-            value_col = p.value_field.GetStrings()[p.value_field.GetSelection()]
-            type_id_col = p.type_col_field.GetStrings()[p.type_col_field.GetSelection()]
-            xls_list = p.excell_list_field.GetStrings()[
-                p.excell_list_field.GetSelection()
-            ]
-            df = pd.read_excel(
-                p.xls_path,
-                dtype=str,
-                na_filter=False,
-                sheet_name=xls_list,
-            )
-            df = p.filter(df)
-            df = df[[type_id_col, x_col, y_col, z_col, value_col, date_col]]
-            df[value_col] = df[value_col].apply(lambda a: a.replace(".", ","))
-            df = df.rename(columns={
-                type_id_col: "TypeId",
-                x_col: "X",
-                y_col: "Y",
-                z_col: "Z",
-                value_col: "Energy",
-                date_col: "LocTime",
-            })
-            df_str = df.map(
-                lambda x: str(x).replace(".", ",") if isinstance(x, float) else x
-            )
-            df_str.to_excel(self.save_as, index=False)
+            view = self.view
+            if view is None:
+                data = self.workbook.sheet(self.xls_list)
+                view = engine.select(data, self.spec, self.geodesic)
+
+            def progress(written, total):
+                self.set_progress(
+                    written, total, "Записано строк: %d из %d" % (written, total)
+                )
+
+            if not export.write(
+                self.save_as,
+                view,
+                self.columns,
+                decimal_comma=self.decimal_comma,
+                progress=progress,
+                cancelled=self.cancel_event.is_set,
+            ):
+                return None
+            return self.save_as
         except Exception as e:
             tb = traceback.format_exc()
             wx.LogError(f"Exception caught:\n{e}\nTraceback:\n{tb}")
@@ -219,13 +255,26 @@ class SaveExcelJob(TaskJob):
 
 
 class MainWindow(wx.Frame):
+    # загрузка листа и несколько выгрузок могут идти одновременно
+    TASK_WORKERS = 3
+
     def __init__(self):
         super().__init__(None, title="Фильтр БД АСКСМ", size=wx.Size(550, 850))
         self.xls_path = None
-        self.df_cache = None
+        self.workbook = None
+        self.load_task = None
+        self.scheduler = TaskScheduler(self, self.TASK_WORKERS)
+        self.filter_worker = FilterWorker(self.on_filtered)
         self.header = None
+        # (лист, параметры фильтра, геод. координаты) результата в таблице
+        self.result_key = None
+        self.sheet_cache = sheetcache.SheetCache()
+        self.dicts = dictionaries.DictRegistry()
         self.menu = MainMenu()
         self.SetMenuBar(self.menu)
+        self.statusbar = MainStatusBar(self)
+        self.SetStatusBar(self.statusbar)
+        memory_handler.add_listener(self.on_span)
         sz = wx.BoxSizer(wx.VERTICAL)
         self.splitter = wx.SplitterWindow(self, style=wx.SP_LIVE_UPDATE)
         self.left = wx.ScrolledWindow(self.splitter)
@@ -289,6 +338,10 @@ class MainWindow(wx.Frame):
         l_sz_in_h.Add(self.comment_field)
         l_sz_in_h.Add(self.source_file_field)
         l_sz_in.Add(l_sz_in_h, 0, wx.EXPAND | wx.BOTTOM, border=10)
+        self.geodesic_field = wx.CheckBox(
+            self.left, label="Геодезические координаты (таблица и выгрузка)"
+        )
+        l_sz_in.Add(self.geodesic_field, 0, wx.BOTTOM, border=10)
         label = wx.StaticText(self.left, label="Фильтр событий")
         font = label.GetFont()
         font.MakeBold()  # начиная с wxPython 4.1
@@ -333,12 +386,17 @@ class MainWindow(wx.Frame):
         self.splitter.SetSashGravity(1)
         self.splitter.SplitHorizontally(self.left, self.right, 400)
         sz.Add(self.splitter, 1, wx.EXPAND)
+        self.tasks_panel = TaskPanel(self, self.scheduler)
+        sz.Add(self.tasks_panel, 0, wx.EXPAND)
         p = wx.Panel(self)
         p_sz = wx.BoxSizer(wx.VERTICAL)
         p.SetSizer(p_sz)
         btn_sz = wx.StdDialogButtonSizer()
+        self.decimal_comma_field = wx.CheckBox(p, label="Десятичная запятая")
+        self.decimal_comma_field.SetValue(True)
         self.save_button = wx.Button(p, label="Сохранить")
         self.open_button = wx.Button(p, label="Открыть в Excell")
+        btn_sz.Add(self.decimal_comma_field, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, border=10)
         btn_sz.Add(self.save_button, wx.RIGHT, border=10)
         btn_sz.Add(self.open_button)
         self.save_button.Disable()
@@ -365,50 +423,120 @@ class MainWindow(wx.Frame):
         self.source_file_field.Bind(wx.EVT_CHOICE, self.render_grid)
         self.type_field.Bind(wx.EVT_CHECKLISTBOX, self.render_grid)
         self.field_field.Bind(wx.EVT_CHECKLISTBOX, self.render_grid)
+        self.geodesic_field.Bind(wx.EVT_CHECKBOX, self.render_grid)
         self.save_button.Bind(wx.EVT_BUTTON, self.on_save)
+        self.Bind(wx.EVT_MENU, self.on_clear_cache, self.menu.clear_cache_item)
+        self.Bind(wx.EVT_MENU, self.on_diagnostics, self.menu.diagnostics_item)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+    def on_close(self, event):
+        if self.scheduler.is_busy() and event.CanVeto():
+            ret = wx.MessageBox(
+                "Выполняются фоновые задачи. Прервать их и закрыть программу?",
+                "Закрытие",
+                wx.YES_NO | wx.ICON_QUESTION,
+            )
+            if ret != wx.YES:
+                event.Veto()
+                return
+        self.scheduler.cancel_all()
+        event.Skip()
+
+    def on_dicts_changed(self, paths):
+        """
+        Файлы справочников изменились на диске. Сбрасываются только эти
+        справочники и зависящие от них маски фильтра, остальные критерии
+        берутся из кэша; таблица перестраивается один раз на всю серию.
+        """
+        names = [name for name in map(self.dicts.invalidate, paths) if name is not None]
+        columns_changed = any(name.startswith("cols/") for name in names)
+        criteria = [c for name in names for c in dictionaries.DEPENDENT_CRITERIA.get(name, ())]
+        if columns_changed:
+            print("Reloading grid columns...")
+            self.suggest_columns()
+        if criteria and self.workbook is not None:
+            self.workbook.invalidate_masks(*criteria)
+        if columns_changed or criteria:
+            self.render_grid()
+
+    def on_span(self, data):
+        # замеры приходят из любых потоков
+        wx.CallAfter(self.show_span, data)
+
+    def show_span(self, data):
+        if self:  # окно могло быть уже закрыто
+            self.statusbar.show_span(data)
+
+    def on_diagnostics(self, event):
+        with DiagnosticsDialog(self, memory_handler) as dlg:
+            dlg.ShowModal()
+
+    def on_clear_cache(self, event):
+        size = self.sheet_cache.size() / 1024 / 1024
+        ret = wx.MessageBox(
+            "Удалить кэш разобранных листов (%.1f МБ)?" % size,
+            "Очистка кэша",
+            wx.YES_NO | wx.ICON_QUESTION,
+        )
+        if ret == wx.YES:
+            self.sheet_cache.clear()
 
     def on_save(self, event):
+        if self.load_task is not None:
+            return
         with wx.FileDialog(
             self,
-            "Сохранить Excel",
-            wildcard="Excel файлы (*.xlsx)|*.xlsx",
+            "Сохранить выборку",
+            wildcard=export.wildcard(),
             style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
         ) as dlg:
             if dlg.ShowModal() == wx.ID_CANCEL:
                 return  # пользователь отменил
 
             path = dlg.GetPath()
-            # добавим расширение, если пользователь не указал
-            if not path.lower().endswith(".xlsx"):
-                path += ".xlsx"
+            # добавим расширение выбранного формата, если пользователь не указал
+            ext = export.FORMATS[dlg.GetFilterIndex()][1]
+            if not path.lower().endswith(ext):
+                path += ext
+
+            import os
 
-            self.save_task = Task(
-                "Сохранение файла",
-                "идет сохранение файла...",
+            # выгрузка не блокирует окно: можно продолжать работу и сохранять еще
+            task = self.scheduler.submit(
                 SaveExcelJob(self, path),
-                parent=self,
-                can_abort=False,
+                "Сохранение %s" % os.path.basename(path),
+                priority=NORMAL,
             )
-            self.save_task.then(self.on_resolve, self.on_reject)
-            self.save_task.run()
+            task.then(self.on_resolve, self.on_reject)
 
     def on_resolve(self, result):
+        if result is None:
+            # сохранение отменено
+            return
+        if result.lower().endswith(".parquet"):
+            wx.MessageBox("Файл успешно сохранен.", "Сохранение завершено")
+            return
         ret = wx.MessageBox("Файл успешно сохранен. Открыть его в Excell?", "Сохранение завершено", wx.YES_NO | wx.ICON_QUESTION)
         if ret == wx.YES:
             import os
-            os.startfile(self.save_task.job.save_as)
+            os.startfile(result)
 
     def on_reject(self, error):
         ...
 
+    def cancel_sheet_tasks(self):
+        """Отменяет загрузку листа, который больше не показывается."""
+        if self.load_task is not None:
+            self.scheduler.cancel(self.load_task)
+        self.load_task = None
+
     def on_select_excell_list(self, event):
-        xls = pd.ExcelFile(self.xls_path)
-        sheets = xls.sheet_names
-        self.header = pd.read_excel(
-            xls, nrows=0, sheet_name=sheets[self.excell_list_field.GetSelection()]
-        ).columns.tolist()
+        self.filter_worker.cancel()
+        self.cancel_sheet_tasks()
+        self.result_key = None
+        sheets = self.workbook.sheet_names
+        self.header = self.workbook.header(sheets[self.excell_list_field.GetSelection()])
         self.header = list(map(lambda x: x.strip(), self.header))
-        xls.close()
         self.x_field.Clear()
         for item in self.header:
             self.x_field.Append(item)
@@ -434,11 +562,91 @@ class MainWindow(wx.Frame):
         for item in self.header:
             self.date_field.Append(item)
 
-        self.df_cache = None
         self.suggest_columns()
+        sheet_name = sheets[self.excell_list_field.GetSelection()]
+        # дисковый кэш проверяет SheetLoadJob: для нового файла это хэширование
+        # всей книги, его нельзя делать в потоке интерфейса
+        if self.workbook.is_loaded(sheet_name):
+            self.on_sheet_loaded(None)
+            return
+        self.preview = None
+        self.preview_chunks = []
+        self.preview_time = 0
+        self.right.update(resultview.ResultView({}, []), [])
+        task = self.load_task = self.scheduler.submit(
+            SheetLoadJob(self.workbook, sheet_name, on_chunk=self.on_sheet_chunk),
+            "Загрузка листа %s" % sheet_name,
+            priority=HIGH,
+        )
+        # результат отмененной загрузки (выбран другой лист или файл) не показываем
+        task.then(
+            lambda result: task is self.load_task and self.on_sheet_loaded(result),
+            lambda error: task is self.load_task and self.on_sheet_load_failed(error),
+        )
+        self.update_controls_state()
+
+    def on_sheet_load_failed(self, error):
+        self.load_task = None
+        self.update_controls_state()
+        # ошибки отмененных загрузок (закрытая книга) сюда не попадают
+        tb = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        wx.LogError(f"Не удалось загрузить лист:\n{error}\nTraceback:\n{tb}")
+        self.on_reject(error)
+
+    def on_sheet_chunk(self, job, chunk):
+        """
+        Показывает в таблице отфильтрованные строки уже прочитанных порций листа,
+        пока остальная часть загружается. После загрузки предпросмотр заменяется
+        полным результатом из render_grid.
+        """
+        if self.load_task is None or job is not self.load_task.job:
+            return
+        if self.load_task.job.cancel_event.is_set():
+            return
+        self.suggest_filter(chunk)
+        spec = self.filter_spec()
+        extra = None
+        if self.geodesic_field.IsChecked():
+            c = spec.columns
+            extra = transform.geodesic_frame(chunk, c.x_col, c.y_col, c.z_col)
+        rows = engine.filter_rows(chunk, spec)
+        if extra is not None:
+            chunk = pd.concat([chunk, extra], axis=1)
+        # порции не склеиваются: таблица читает их через ChunkedView, прежние
+        # строки при обновлении не копируются
+        self.preview_chunks.append(chunk.take(rows))
+        now = time.time()
+        if self.preview is not None and now - self.preview_time < 0.5:
+            return
+        self.preview_time = now
+        shown = self.preview is not None
+        self.preview = resultview.ChunkedView(self.preview_chunks)
+        if not shown:
+            self.right.update(self.preview, self.grid_header())
+            for col in range(self.right.GetColumnCount()):
+                self.right.SetColumnWidth(col, wx.LIST_AUTOSIZE)
+        else:
+            self.right.set_rows(self.preview)
+
+    def on_sheet_loaded(self, result):
+        self.load_task = None
+        self.update_controls_state()
+        self.preview = None
+        self.preview_chunks = []
+        if not self.is_sheet_loaded():
+            self.right.update(resultview.ResultView({}, []), [])
+            return
         self.suggest_filter()
         self.render_grid()
 
+    def is_sheet_loaded(self):
+        if self.workbook is None or self.excell_list_field.GetSelection() == wx.NOT_FOUND:
+            return False
+        xls_list = self.excell_list_field.GetStrings()[
+            self.excell_list_field.GetSelection()
+        ]
+        return self.workbook.is_loaded(xls_list)
+
     def on_select_all_types(self, event):
         self.type_field.SetCheckedItems(list(range(15)))
         self.render_grid()
@@ -448,7 +656,8 @@ class MainWindow(wx.Frame):
         self.render_grid()
 
     def update_controls_state(self):
-        self.save_button.Enable(self.xls_path is not None)
+        # пока лист загружается, выгрузка разобрала бы его второй раз параллельно с загрузкой
+        self.save_button.Enable(self.xls_path is not None and self.load_task is None)
         self.open_button.Enable(self.xls_path is not None)
 
     def on_file_picker_changed(self, event):
@@ -459,13 +668,13 @@ class MainWindow(wx.Frame):
             wx.MessageBox("Неверный файл: %s" % path)
             return
 
-        info = wx.BusyInfo("Загрузка данных, пожалуйста подождите...", parent=self.left)
-        wx.Yield()  # даём GUI обновиться
-
+        self.cancel_sheet_tasks()
+        if self.workbook is not None:
+            self.workbook.close()
+        self.result_key = None
         self.xls_path = path
-        xls = pd.ExcelFile(path)
-        lis_ = xls.sheet_names
-        xls.close()
+        self.workbook = workbook.Workbook(path, self.sheet_cache)
+        lis_ = self.workbook.sheet_names
         self.excell_list_field.Clear()
         for item in lis_:
             self.excell_list_field.Append(item)
@@ -476,29 +685,14 @@ class MainWindow(wx.Frame):
         self.on_select_excell_list(event)
         self.update_controls_state()
 
-        del info
-
     def suggest_columns(self):
         if self.xls_path is None:
             return
 
-        import os
-        import sys
+        column_names = self.dicts.column_names()
 
-        def get_main_script_path():
-            if getattr(sys, "frozen", False):  # приложение собрано PyInstaller
-                return os.path.dirname(os.path.abspath(sys.executable))
-            else:
-                return os.path.dirname(os.path.abspath(sys.argv[0]))
-
-        def sugg(field, sugg_dict_file, fallback_sugg_dict, default_offset):
-            try:
-                with open(sugg_dict_file, "r", encoding="utf-8") as f:
-                    sugg_dict = f.readlines()
-                    sugg_dict = [line.strip() for line in sugg_dict]
-            except (FileNotFoundError, PermissionError, IOError) as e:
-                print("cannot load file %s, %s" % (sugg_dict_file, e))
-                sugg_dict = fallback_sugg_dict
+        def sugg(field, key, default_offset):
+            sugg_dict = column_names[key]
             for item in self.header:
                 if item.strip() in sugg_dict:
                     try:
@@ -511,52 +705,29 @@ class MainWindow(wx.Frame):
                             field.SetSelection(len(field.GetItems()) - 1)
                     break
 
-        sugg(self.x_field, "dict/cols/x.txt", ["EX", "X"], 0)
-        sugg(self.y_field, "dict/cols/y.txt", ["EY", "Y"], 1)
-        sugg(self.z_field, "dict/cols/z.txt", ["EZ", "Z"], 2)
-        sugg(self.value_field, "dict/cols/value.txt", ["EEnergy", "Energy"], 3)
-        sugg(self.date_field, "dict/cols/time.txt", ["ELocTime"], 4)
-        sugg(
-            self.type_col_field,
-            "dict/cols/type_id.txt",
-            ["ETypeId", "TypeId"],
-            5,
-        )
-        sugg(
-            self.comment_field,
-            "dict/cols/comment.txt",
-            ["EComment", "Comment"],
-            6,
-        )
-        sugg(
-            self.source_file_field,
-            "dict/cols/source_filename.txt",
-            ["ESourseFileName", "ESourceFileName", "SourceFileName"],
-            7,
-        )
+        sugg(self.x_field, "x_col", 0)
+        sugg(self.y_field, "y_col", 1)
+        sugg(self.z_field, "z_col", 2)
+        sugg(self.value_field, "value_col", 3)
+        sugg(self.date_field, "date_col", 4)
+        sugg(self.type_col_field, "type_id_col", 5)
+        sugg(self.comment_field, "comment_col", 6)
+        sugg(self.source_file_field, "filename_col", 7)
 
-    def suggest_filter(self):
+    def suggest_filter(self, df=None):
         i = self.type_col_field.GetSelection()
         column = self.header[i]
-        if self.df_cache is None:
+        if df is None:
             xls_list = self.excell_list_field.GetStrings()[
                 self.excell_list_field.GetSelection()
             ]
-            df = pd.read_excel(
-                self.xls_path,
-                dtype=str,
-                na_filter=False,
-                sheet_name=xls_list,
-            )
-            self.df_cache = df
-        else:
-            df = self.df_cache
+            df = self.workbook.sheet(xls_list).df
 
-        unique_values = df[column].unique()
+        unique_values = coltypes.format_column(pd.Series(df[column].unique()))
         strings = self.type_field.GetStrings()
         for val in unique_values:
-            if str(val) in strings:
-                index = strings.index(str(val))
+            if val in strings:
+                index = strings.index(val)
                 self.type_field.Check(index, True)
 
     def append_row(self, values):
@@ -565,121 +736,97 @@ class MainWindow(wx.Frame):
         for col, val in enumerate(values[1:], start=1):
             self.right.SetItem(index, col, str(val))  # остальные колонки
 
-    def filter(self, df):
-        x_col = self.x_field.GetStrings()[self.x_field.GetSelection()]
-        y_col = self.y_field.GetStrings()[self.y_field.GetSelection()]
-        z_col = self.z_field.GetStrings()[self.z_field.GetSelection()]
-        value_col = self.value_field.GetStrings()[self.value_field.GetSelection()]
-        type_id_col = self.type_col_field.GetStrings()[
-            self.type_col_field.GetSelection()
-        ]
-        comment_col = self.comment_field.GetStrings()[self.comment_field.GetSelection()]
-        type_id_col = self.type_col_field.GetStrings()[
-            self.type_col_field.GetSelection()
-        ]
-        filename_col = self.source_file_field.GetStrings()[
-            self.source_file_field.GetSelection()
-        ]
+    def column_mapping(self):
+        """Выбранные в элементах управления столбцы листа."""
+
+        def selected(field):
+            return field.GetStrings()[field.GetSelection()]
+
+        return engine.ColumnMapping(
+            x_col=selected(self.x_field),
+            y_col=selected(self.y_field),
+            z_col=selected(self.z_field),
+            value_col=selected(self.value_field),
+            date_col=selected(self.date_field),
+            type_id_col=selected(self.type_col_field),
+            comment_col=selected(self.comment_field),
+            filename_col=selected(self.source_file_field),
+        )
+
+    def filter_spec(self):
+        """
+        Считывает из элементов управления все входные данные фильтра. Вызывается
+        в потоке интерфейса, сам фильтр (engine.filter_rows) с виджетами не
+        работает и может выполняться в фоне.
+        """
         checked_indices = self.type_field.GetCheckedItems()
         selected_types = [self.type_field.GetString(i) for i in checked_indices]
-        sort_by_field = True
 
-        kir_comment_blacklist = []
-        try:
-            with open("dict/blacklist/kir.txt", "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                lines = [line.strip() for line in lines if line and line.strip()]
-                kir_comment_blacklist.extend(lines)
-        except Exception:
-            ...
-        ras_comment_blacklist = []
-        try:
-            with open("dict/blacklist/ras.txt", "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                lines = [line.strip() for line in lines if line and line.strip()]
-                ras_comment_blacklist.extend(lines)
-        except Exception:
-            ...
-
-        print(kir_comment_blacklist, ras_comment_blacklist)
-        filename_mask = ()
-        if self.field_field.IsChecked(0) and self.field_field.IsChecked(1):
-            filename_mask = (".KIR", ".RAS")
-        elif self.field_field.IsChecked(0):
-            filename_mask = ".KIR"
-        elif self.field_field.IsChecked(1):
-            filename_mask = ".RAS"
-
-        mask = (
-            (df[x_col] != "")
-            & (df[y_col] != "")
-            & (df[z_col] != "")
-            & (df[value_col] != "")
-            & df[type_id_col].astype(str).isin(selected_types)
-            & df[filename_col].str.endswith(filename_mask, na=False)
-        )
-        kir_mask = ~df[filename_col].str.endswith(".KIR", na=False) | ~df[
-            comment_col
-        ].str.strip().apply(
-            lambda x: any(fnmatch.fnmatch(x, p) for p in kir_comment_blacklist)
-        )
-        ras_mask = ~df[filename_col].str.endswith(".RAS", na=False) | ~df[
-            comment_col
-        ].str.strip().apply(
-            lambda x: any(fnmatch.fnmatch(x, p) for p in ras_comment_blacklist)
+        kir_comment_blacklist, ras_comment_blacklist = self.dicts.blacklists()
+        selected_mines = []
+        if self.field_field.IsChecked(0):
+            selected_mines.append(mines.KIR)
+        if self.field_field.IsChecked(1):
+            selected_mines.append(mines.RAS)
+
+        return engine.FilterSpec(
+            columns=self.column_mapping(),
+            types=tuple(selected_types),
+            mines=tuple(selected_mines),
+            kir_blacklist=kir_comment_blacklist,
+            ras_blacklist=ras_comment_blacklist,
         )
-        df = df[mask & kir_mask & ras_mask].copy()
-        if sort_by_field:
-            df.loc[:, "suffix"] = df[filename_col].str[-4:]
-            df = df.sort_values(by=["suffix"])
-            df = df.drop(columns=["suffix"])
-        return df.reset_index(drop=True)
+
+    def grid_header(self):
+        c = self.column_mapping()
+        return [
+            (c.type_id_col, "Тип"),
+            (c.x_col, "X"),
+            (c.y_col, "Y"),
+            (c.z_col, "Z"),
+            (c.value_col, "Энергия"),
+            (c.date_col, "Время события"),
+            (c.comment_col, "Комментарий"),
+            (c.filename_col, "Исходный файл"),
+        ] + self.geodesic_header()
+
+    def geodesic_header(self):
+        if not self.geodesic_field.IsChecked():
+            return []
+        return list(zip(transform.GEO_COLUMNS, ["Геод. X", "Геод. Y", "Геод. Z"]))
+
+    def displayed_result(self, xls_list, spec, geodesic):
+        """ResultView, показанный в таблице (в текущем порядке сортировки), если он получен с такими параметрами."""
+        if self.result_key != (xls_list, spec, geodesic):
+            return None
+        return self.right.view
 
     def render_grid(self, event=None):
-        if self.xls_path is None:
+        if not self.is_sheet_loaded():
             return
 
-        info = wx.BusyInfo("Загрузка данных, пожалуйста подождите...", parent=self.left)
-        wx.Yield()  # даём GUI обновиться
-        x_col = self.x_field.GetStrings()[self.x_field.GetSelection()]
-        y_col = self.y_field.GetStrings()[self.y_field.GetSelection()]
-        z_col = self.z_field.GetStrings()[self.z_field.GetSelection()]
-        date_col = self.date_field.GetStrings()[self.date_field.GetSelection()]
-        value_col = self.value_field.GetStrings()[self.value_field.GetSelection()]
-        comment_col = self.comment_field.GetStrings()[self.comment_field.GetSelection()]
-        type_id_col = self.type_col_field.GetStrings()[
-            self.type_col_field.GetSelection()
-        ]
-        filename_col = self.source_file_field.GetStrings()[
-            self.source_file_field.GetSelection()
-        ]
         xls_list = self.excell_list_field.GetStrings()[
             self.excell_list_field.GetSelection()
         ]
-        if self.df_cache is None:
-            df = pd.read_excel(
-                self.xls_path,
-                dtype=str,
-                na_filter=False,
-                sheet_name=xls_list,
-            )
-            self.df_cache = df
-        else:
-            df = self.df_cache
-        df = self.filter(df)
-        header = [
-            (type_id_col, "Тип"),
-            (x_col, "X"),
-            (y_col, "Y"),
-            (z_col, "Z"),
-            (value_col, "Энергия"),
-            (date_col, "Время события"),
-            (comment_col, "Комментарий"),
-            (filename_col, "Исходный файл"),
-        ]
-        self.right.update(df, header, x_col=1, y_col=2, z_col=3)
-
-        for col in range(self.right.GetColumnCount()):
-            self.right.SetColumnWidth(col, wx.LIST_AUTOSIZE)
-
-        del info
+        data = self.workbook.sheet(xls_list)
+        spec = self.filter_spec()
+        header = self.grid_header()
+        geodesic = self.geodesic_field.IsChecked()
+
+        def job(cancelled):
+            view = engine.select(data, spec, geodesic, cancelled)
+            if view is None:
+                return None
+            return view, header, (xls_list, spec, geodesic)
+
+        self.filter_worker.submit(job)
+
+    def on_filtered(self, result):
+        view, header, key = result
+        with span("grid.update", len(view)):
+            self.right.update(view, header, x_col=1, y_col=2, z_col=3)
+        self.result_key = key
+
+        with span("grid.autosize", min(len(view), self.right.GetCountPerPage())):
+            for col in range(self.right.GetColumnCount()):
+                self.right.SetColumnWidth(col, wx.LIST_AUTOSIZE)
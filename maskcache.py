@@ -0,0 +1,42 @@
+import threading
+
+import numpy as np
+
+
+class MaskCache:
+    """
+    Кэш булевых масок отдельных критериев фильтра для одного листа.
+
+    Каждая маска хранится вместе с ключом, описывающим все входные данные
+    критерия (выбранные столбцы, отмеченные типы, содержимое черного списка и т.д.).
+    Пока ключ не меняется, маска берется из кэша, поэтому при изменении одного
+    элемента управления пересчитывается только зависящий от него критерий.
+    Так же кэшируются и другие производные массивы листа (коды рудников,
+    порядок сортировки), для них указывается свой dtype.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.masks = {}
+
+    def get(self, name, key, compute, dtype=bool):
+        """
+        Возвращает маску критерия name. Если сохраненный ключ отличается от key,
+        маска пересчитывается вызовом compute().
+        """
+        with self.lock:
+            cached = self.masks.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        mask = np.asarray(compute(), dtype=dtype)
+        with self.lock:
+            self.masks[name] = (key, mask)
+        return mask
+
+    def invalidate(self, *names):
+        """Сбрасывает маски перечисленных критериев, без аргументов - все маски."""
+        with self.lock:
+            if not names:
+                self.masks = {}
+            for name in names:
+                self.masks.pop(name, None)
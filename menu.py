@@ -8,6 +8,7 @@ class MainMenu(wx.MenuBar):
     def __init__(self):
         super().__init__()
         m = wx.Menu()
+        self.clear_cache_item = m.Append(wx.ID_ANY, "Очистить кэш")
         self.Append(m, "&Файл")
         m = wx.Menu()
         mm = wx.Menu()
@@ -38,6 +39,7 @@ class MainMenu(wx.MenuBar):
         m.Bind(wx.EVT_MENU, lambda event: self.open("dict/order.txt"), i)
         self.Append(m, "&Словари")
         m = wx.Menu()
+        self.diagnostics_item = m.Append(wx.ID_ANY, "Диагностика")
         self.Append(m, "&Помощь")
 
     def open(self, filename):
@@ -0,0 +1,28 @@
+import numpy as np
+
+from coltypes import format_column
+from encoding import factorize
+
+# Рудник события определяется по расширению исходного файла.
+KIR = 0
+RAS = 1
+OTHER = 2
+SUFFIXES = {".KIR": KIR, ".RAS": RAS}
+
+
+def mine_codes(series):
+    """
+    Код рудника (KIR, RAS или OTHER) для каждой строки столбца с именем исходного
+    файла. Расширение проверяется только у уникальных имен.
+    """
+    codes, uniques = factorize(series)
+    names = format_column(uniques)
+    by_unique = np.full(len(uniques) + 1, OTHER, dtype=np.int8)
+    for suffix, code in SUFFIXES.items():
+        by_unique[:-1][names.str.endswith(suffix).to_numpy(dtype=bool)] = code
+    return by_unique[codes]
+
+
+def mine_order(codes):
+    """Устойчивая перестановка строк, группирующая их по коду рудника (KIR, затем RAS)."""
+    return np.argsort(codes, kind="stable")
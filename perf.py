@@ -0,0 +1,130 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Замеры этапов обработки (загрузка листа, фильтр, таблица, выгрузка).
+#
+# Каждый замер (span) записывается в логгер "runtime" с временем выполнения,
+# числом строк и изменением памяти процесса. MemoryHandler хранит последние
+# записи для окна диагностики и сообщает о новых замерах подписчикам
+# (строке состояния главного окна).
+
+logger = logging.getLogger("runtime")
+logger.setLevel(logging.DEBUG)
+
+
+def memory_usage():
+    """Объем памяти процесса в байтах (рабочий набор / RSS), 0 если узнать нельзя."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(),
+                ctypes.byref(counters),
+                counters.cb,
+            )
+            return counters.WorkingSetSize
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+class MemoryHandler(logging.Handler):
+    """Хранит последние capacity записей логгера и передает замеры подписчикам."""
+
+    def __init__(self, capacity=10000):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.listeners = []
+        self.records_lock = threading.Lock()
+
+    def emit(self, record):
+        with self.records_lock:
+            self.records.append(record)
+            listeners = list(self.listeners)
+        data = getattr(record, "span", None)
+        if data is not None:
+            for listener in listeners:
+                listener(data)
+
+    def add_listener(self, listener):
+        """listener(span) вызывается в потоке, где сделан замер."""
+        with self.records_lock:
+            self.listeners.append(listener)
+
+    def get_logs(self):
+        with self.records_lock:
+            return [self.format(record) for record in self.records]
+
+    def spans(self):
+        """Словари замеров: stage, seconds, rows, memory, memory_delta, time."""
+        with self.records_lock:
+            return [r.span for r in self.records if getattr(r, "span", None) is not None]
+
+
+memory_handler = MemoryHandler()
+formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+memory_handler.setFormatter(formatter)
+logger.addHandler(memory_handler)
+
+
+@contextmanager
+def span(stage, rows=None):
+    """
+    Замеряет время и изменение памяти блока и записывает их в логгер "runtime".
+    Возвращает словарь, в котором блок может уточнить число строк: info["rows"] = n.
+    """
+    info = {"rows": rows}
+    memory = memory_usage()
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = time.perf_counter() - start
+        after = memory_usage()
+        data = {
+            "time": time.time(),
+            "stage": stage,
+            "seconds": seconds,
+            "rows": info["rows"],
+            "memory": after,
+            "memory_delta": after - memory,
+        }
+        logger.info(
+            "%s: %.3f s, rows=%s, memory=%.1f MB (%+.1f MB)",
+            stage,
+            seconds,
+            info["rows"],
+            after / 2**20,
+            (after - memory) / 2**20,
+            extra={"span": data},
+        )
+
+
+def timed(stage, func, rows=None):
+    """Вызывает func() внутри span(stage) и возвращает ее результат."""
+    with span(stage, rows):
+        return func()
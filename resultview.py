@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from coltypes import descending_order, format_column
+
+
+class ResultView:
+    """
+    Результат фильтрации без копирования строк: массив номеров строк (rows) в
+    базовых данных листа и ссылки на столбцы этих данных. Таблица и выгрузка
+    читают значения через rows только для нужного диапазона.
+    """
+
+    def __init__(self, columns, rows, order=None):
+        """
+        :param columns: словарь код столбца -> Series базовых данных (все строки листа)
+        :param rows: массив позиций отобранных строк в порядке показа
+        :param order: функция order(код столбца), возвращающая закэшированную
+            перестановку всех базовых строк по возрастанию столбца; без нее
+            представление нельзя сортировать
+        """
+        self.columns = columns
+        self.rows = np.asarray(rows, dtype=np.intp)
+        self.order = order
+        self._categories = {}
+
+    @classmethod
+    def from_frames(cls, rows, *frames, order=None):
+        """Представление над столбцами нескольких выровненных по строкам DataFrame (None пропускаются)."""
+        columns = {}
+        for frame in frames:
+            if frame is not None:
+                columns.update(frame.items())
+        return cls(columns, rows, order)
+
+    def can_sort(self):
+        return self.order is not None
+
+    def sorted(self, code, descending=False):
+        """
+        Представление тех же строк, упорядоченных по столбцу code. Строки не
+        сортируются заново: из готовой перестановки базовых данных оставляются
+        только входящие в представление.
+        """
+        perm = self.order(code)
+        selected = np.zeros(len(perm), dtype=bool)
+        selected[self.rows] = True
+        rows = perm[selected[perm]]
+        if descending:
+            # не perm[::-1]: пустые значения остаются в конце, а равные - в исходном порядке
+            rows = rows[descending_order(self.columns[code].take(rows))]
+        view = ResultView(self.columns, rows, self.order)
+        view._categories = self._categories
+        return view
+
+    def __len__(self):
+        return len(self.rows)
+
+    def values(self, code, start=0, stop=None):
+        """Значения столбца для строк результата с start по stop."""
+        return self.columns[code].take(self.rows[start:stop])
+
+    def text(self, code, start=0, stop=None):
+        """Массив строк столбца для строк результата с start по stop, см. coltypes.format_column."""
+        series = self.columns[code]
+        rows = self.rows[start:stop]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # словарь форматируем один раз на представление
+            if code not in self._categories:
+                categories = format_column(pd.Series(series.cat.categories))
+                self._categories[code] = np.append(
+                    categories.to_numpy(dtype=object), ""
+                )
+            return self._categories[code][series.cat.codes.to_numpy()[rows]]
+        return format_column(series.take(rows)).to_numpy(dtype=object)
+
+
+class ChunkedView:
+    """
+    Строки нескольких DataFrame подряд, без их склейки. Используется для
+    предпросмотра загружаемого листа: новая порция добавляется к списку, не
+    копируя прежние. Сортировки нет.
+    """
+
+    def __init__(self, frames):
+        self.frames = [frame for frame in frames if len(frame)]
+        self.offsets = np.cumsum([0] + [len(frame) for frame in self.frames])
+
+    def can_sort(self):
+        return False
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def text(self, code, start=0, stop=None):
+        """Массив строк столбца для строк с start по stop, см. coltypes.format_column."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        parts = []
+        first = max(int(np.searchsorted(self.offsets, start, side="right")) - 1, 0)
+        for i in range(first, len(self.frames)):
+            offset = self.offsets[i]
+            if offset >= stop:
+                break
+            frame = self.frames[i]
+            part = frame[code].iloc[max(start - offset, 0) : stop - offset]
+            parts.append(format_column(part).to_numpy(dtype=object))
+        if not parts:
+            return np.empty(0, dtype=object)
+        return np.concatenate(parts)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Меняется при изменении способа разбора листов, чтобы старые записи
+# кэша не подхватывались новым кодом.
+FORMAT_VERSION = 4
+
+
+def default_cache_dir():
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "seismicfilter", "sheets")
+
+
+def file_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SheetCache:
+    """
+    Дисковый кэш разобранных листов Excel.
+
+    Каждый лист сохраняется в отдельный файл Feather (или pickle, если
+    pyarrow недоступен). Ключ записи строится из хэша содержимого файла и
+    имени листа, а путь, размер и время изменения используются, чтобы не
+    пересчитывать хэш для неизменившихся файлов. Общий размер кэша
+    ограничен max_bytes, при переполнении удаляются давно не использованные
+    записи.
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, dirname=None, max_bytes=2 * 1024**3):
+        self.dirname = dirname or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.dirname, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.dirname, self.INDEX), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == FORMAT_VERSION:
+                return index
+            # записи старого формата больше не подходят
+            for entry in index.get("entries", {}).values():
+                try:
+                    os.remove(os.path.join(self.dirname, entry["file"]))
+                except OSError:
+                    ...
+        except (OSError, ValueError, KeyError, AttributeError):
+            ...
+        return {"version": FORMAT_VERSION, "files": {}, "entries": {}}
+
+    def _save_index(self):
+        path = os.path.join(self.dirname, self.INDEX)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(path + ".tmp", path)
+
+    def fingerprint(self, path):
+        """Возвращает хэш содержимого файла, пересчитывая его только при изменении размера или mtime."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self.lock:
+            known = self.index["files"].get(path)
+        if known and known["size"] == st.st_size and known["mtime"] == st.st_mtime_ns:
+            return known["hash"]
+        digest = file_hash(path)
+        with self.lock:
+            self.index["files"][path] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "hash": digest,
+            }
+            self._save_index()
+        return digest
+
+    def _entry_name(self, path, sheet_name):
+        sheet = hashlib.sha1(str(sheet_name).encode("utf-8")).hexdigest()[:16]
+        return "%s_%s" % (self.fingerprint(path), sheet)
+
+    def get(self, path, sheet_name):
+        try:
+            name = self._entry_name(path, sheet_name)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.index["entries"].get(name)
+        if entry is None:
+            return None
+        filename = os.path.join(self.dirname, entry["file"])
+        import pandas as pd
+
+        try:
+            if filename.endswith(".feather"):
+                df = pd.read_feather(filename)
+            else:
+                df = pd.read_pickle(filename)
+        except Exception as e:
+            print("cannot read cache entry %s, %s" % (filename, e))
+            with self.lock:
+                self.index["entries"].pop(name, None)
+                self._save_index()
+            return None
+        with self.lock:
+            entry["used"] = time.time()
+            self._save_index()
+        return df
+
+    def put(self, path, sheet_name, df):
+        try:
+            name = self._entry_name(path, sheet_name)
+        except OSError:
+            return
+        filename = os.path.join(self.dirname, name + ".feather")
+        try:
+            df.to_feather(filename)
+        except Exception:
+            # pyarrow не установлен или столбцы не поддерживаются Feather
+            if os.path.exists(filename):
+                os.remove(filename)
+            filename = os.path.join(self.dirname, name + ".pkl")
+            df.to_pickle(filename)
+        with self.lock:
+            self.index["entries"][name] = {
+                "file": os.path.basename(filename),
+                "size": os.path.getsize(filename),
+                "used": time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        entries = self.index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        for name in sorted(entries, key=lambda n: entries[n]["used"]):
+            if total <= self.max_bytes:
+                break
+            entry = entries.pop(name)
+            total -= entry["size"]
+            try:
+                os.remove(os.path.join(self.dirname, entry["file"]))
+            except OSError:
+                ...
+
+    def size(self):
+        with self.lock:
+            return sum(e["size"] for e in self.index["entries"].values())
+
+    def clear(self):
+        with self.lock:
+            for entry in self.index["entries"].values():
+                try:
+                    os.remove(os.path.join(self.dirname, entry["file"]))
+                except OSError:
+                    ...
+            self.index = {"version": FORMAT_VERSION, "files": {}, "entries": {}}
+            self._save_index()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 5000
+
+
+def cell_str(value):
+    """Приводит значение ячейки к строке так же, как pandas.read_excel(dtype=str, na_filter=False)."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def make_header(row, width):
+    header = []
+    seen = {}
+    for i in range(width):
+        value = row[i] if i < len(row) else None
+        name = cell_str(value)
+        if name == "":
+            name = "Unnamed: %d" % i
+        if name in seen:
+            seen[name] += 1
+            name = "%s.%d" % (name, seen[name])
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def read_sheet(
+    path,
+    sheet_name,
+    chunk_rows=CHUNK_ROWS,
+    progress=None,
+    cancelled=None,
+    on_chunk=None,
+):
+    """
+    Потоково читает лист .xlsx в режиме read_only порциями по chunk_rows строк.
+    Значения сразу складываются по столбцам в виде строк, поэтому ячейки openpyxl
+    не накапливаются в памяти.
+
+    :param progress: вызывается как progress(прочитано строк, всего строк) после
+        каждой порции; если размер листа неизвестен (в xml нет <dimension> или
+        он меньше прочитанного), всего строк равно -1, а по окончании - прочитанным
+    :param cancelled: функция без аргументов, возвращающая True если чтение
+        нужно прервать
+    :param on_chunk: вызывается с DataFrame только что прочитанной порции,
+        позволяет показывать данные до окончания загрузки
+    :return: DataFrame со строковыми столбцами или None, если чтение прервано
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        # без <dimension> openpyxl не знает число строк, прогресс будет неопределенным
+        total = ws.max_row - 1 if ws.max_row else -1
+        # <dimension> бывает устаревшим, а в режиме read_only openpyxl обрезает
+        # по нему строки и столбцы; как и pandas, читаем лист целиком
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return pd.DataFrame()
+        width = len(first)
+        columns = [[] for _ in range(width)]
+        read = 0
+        chunk = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                width = _append_chunk(columns, chunk, width)
+                read += len(chunk)
+                if on_chunk is not None:
+                    on_chunk(_chunk_frame(first, columns, width, len(chunk)))
+                chunk = []
+                if progress is not None:
+                    progress(read, total if total >= read else -1)
+                if cancelled is not None and cancelled():
+                    return None
+        if chunk:
+            width = _append_chunk(columns, chunk, width)
+            read += len(chunk)
+            if on_chunk is not None:
+                on_chunk(_chunk_frame(first, columns, width, len(chunk)))
+            if progress is not None:
+                progress(read, read)
+    finally:
+        wb.close()
+
+    header = make_header(first, width)
+    data = {}
+    for name, values in zip(header, columns):
+        arr = np.empty(len(values), dtype=object)
+        arr[:] = values
+        values.clear()
+        data[name] = arr
+    return pd.DataFrame(data, copy=False)
+
+
+def _chunk_frame(first, columns, width, size):
+    header = make_header(first, width)
+    return pd.DataFrame({name: values[-size:] for name, values in zip(header, columns)})
+
+
+def _append_chunk(columns, chunk, width):
+    row_width = max(len(row) for row in chunk)
+    if row_width > width:
+        # строки шире заголовка: добавляем пустые столбцы для уже прочитанного
+        filled = len(columns[0]) if columns else 0
+        for _ in range(row_width - width):
+            columns.append([""] * filled)
+        width = row_width
+    for i, values in enumerate(zip(*(row + (None,) * (width - len(row)) for row in chunk))):
+        columns[i].extend(map(cell_str, values))
+    return width
@@ -1,6 +1,29 @@
 import wx
 
 class MainStatusBar(wx.StatusBar):
+    # поле строки состояния для каждой группы замеров perf.span
+    FIELDS = {
+        "probe": 0,
+        "parse": 0,
+        "convert": 0,
+        "cache_load": 0,
+        "filter": 1,
+        "grid": 2,
+        "export": 3,
+    }
+
     def __init__(self, parent):
         super().__init__(parent)
-        self.SetFieldsCount(4)
\ No newline at end of file
+        self.SetFieldsCount(4)
+
+    def show_span(self, data):
+        """Показывает последний замер этапа (словарь из perf.span) в его поле."""
+        group = data["stage"].split(".")[0]
+        field = self.FIELDS.get(group)
+        # отдельные критерии фильтра видны в окне диагностики
+        if field is None or (group == "filter" and data["stage"] != "filter"):
+            return
+        text = "%s: %.2f с" % (data["stage"], data["seconds"])
+        if data["rows"] is not None:
+            text += ", %d строк" % data["rows"]
+        self.SetStatusText(text, field)
@@ -0,0 +1,103 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from coltypes import as_float
+
+# Считаем матрицу трансформации из системы АСКСМ в геодезическую
+G1 = [29929.634, 40713.921, 349.0]
+G2 = [30113.916, 40479.346, 379.0]
+G3 = [29970.552, 40564.192, 225.0]
+A1 = [3261.0, 1156.0, 97.0]
+A2 = [2993.0, 1025.0, 127.0]
+A3 = [3159.0, 1039.0, -27.0]
+source = np.array([A1, A2, A3])
+target = np.array([G1, G2, G3])
+
+
+def calculate_transformation_matrix(source, target):
+    """
+    Вычисляет матрицу преобразования 4x4 между системами координат
+    по трем парам точек.
+
+    :param source: Исходные точки (3x3 numpy array)
+    :param target: Целевые точки (3x3 numpy array)
+    :return: Матрица преобразования 4x4
+    """
+    # Центрирование точек
+    src_centroid = np.mean(source, axis=0)
+    tgt_centroid = np.mean(target, axis=0)
+
+    src_centered = source - src_centroid
+    tgt_centered = target - tgt_centroid
+
+    # Вычисление матрицы H
+    H = np.dot(src_centered.T, tgt_centered)
+
+    # SVD разложение
+    U, _, Vt = np.linalg.svd(H)
+
+    # Матрица вращения
+    R = np.dot(Vt.T, U.T)
+
+    # Коррекция отражений
+    if np.linalg.det(R) < 0:
+        Vt[-1, :] *= -1
+        R = np.dot(Vt.T, U.T)
+
+    # Вектор трансляции
+    t = tgt_centroid - np.dot(R, src_centroid)
+
+    # Формирование матрицы 4x4
+    matrix = np.eye(4)
+    matrix[:3, :3] = R
+    matrix[:3, 3] = t
+
+    return matrix
+
+
+@functools.lru_cache(maxsize=None)
+def asksm_geod():
+    """Матрица АСКСМ -> геодезические координаты, считается при первом обращении."""
+    return calculate_transformation_matrix(source, target)
+
+
+def __getattr__(name):
+    # transform.ASKSM_GEOD по-прежнему доступна, но не считается при импорте
+    if name == "ASKSM_GEOD":
+        return asksm_geod()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def calc_asksm_to_geodesic(x, y, z):
+    x = float(x)
+    y = float(y)
+    z = float(z)
+    gx, gy, gz = np.dot(asksm_geod(), np.array([x, y, z, 1]))[:3]
+    return gx, gy, gz
+
+
+# Коды дополнительных столбцов с геодезическими координатами
+GEO_COLUMNS = ("geo_x", "geo_y", "geo_z")
+
+
+def asksm_to_geodesic(x, y, z, matrix=None):
+    """
+    Переводит массивы координат АСКСМ в геодезические одним матричным умножением.
+    Пустые координаты (NaN) остаются NaN.
+
+    :return: массив (n, 3) геодезических X, Y, Z
+    """
+    if matrix is None:
+        matrix = asksm_geod()
+    xyz = np.column_stack([x, y, z]).astype(np.float64, copy=False)
+    return xyz @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def geodesic_frame(df, x_col, y_col, z_col, matrix=None):
+    """DataFrame геодезических координат (столбцы GEO_COLUMNS, округление до мм) для всех строк df."""
+    g = asksm_to_geodesic(
+        as_float(df[x_col]), as_float(df[y_col]), as_float(df[z_col]), matrix
+    )
+    return pd.DataFrame(np.round(g, 3), columns=list(GEO_COLUMNS), index=df.index)
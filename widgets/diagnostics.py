@@ -0,0 +1,76 @@
+import json
+import time
+
+import wx
+
+
+class DiagnosticsDialog(wx.Dialog):
+    """
+    История замеров этапов (perf.span): время, число строк и память.
+    Историю можно сохранить в файл, чтобы приложить к сообщению о проблеме.
+    """
+
+    COLUMNS = ["Время", "Этап", "Секунды", "Строк", "Память, МБ", "Изменение, МБ"]
+
+    def __init__(self, parent, handler):
+        super().__init__(
+            parent,
+            title="Диагностика",
+            size=wx.Size(700, 450),
+            style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER,
+        )
+        self.handler = handler
+        sz = wx.BoxSizer(wx.VERTICAL)
+        self.list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for i, name in enumerate(self.COLUMNS):
+            self.list.InsertColumn(i, name)
+        sz.Add(self.list, 1, wx.EXPAND | wx.ALL, border=10)
+        btn_sz = wx.BoxSizer(wx.HORIZONTAL)
+        self.refresh_button = wx.Button(self, label="Обновить")
+        self.save_button = wx.Button(self, label="Сохранить в файл...")
+        self.close_button = wx.Button(self, wx.ID_CLOSE, label="Закрыть")
+        btn_sz.Add(self.refresh_button, 0, wx.RIGHT, border=10)
+        btn_sz.Add(self.save_button, 0, wx.RIGHT, border=10)
+        btn_sz.Add(self.close_button)
+        sz.Add(btn_sz, 0, wx.ALIGN_RIGHT | wx.LEFT | wx.RIGHT | wx.BOTTOM, border=10)
+        self.SetSizer(sz)
+        self.refresh_button.Bind(wx.EVT_BUTTON, lambda event: self.refresh())
+        self.save_button.Bind(wx.EVT_BUTTON, self.on_save)
+        self.close_button.Bind(wx.EVT_BUTTON, lambda event: self.Close())
+        self.refresh()
+
+    def refresh(self):
+        self.list.DeleteAllItems()
+        # новые замеры сверху
+        for data in reversed(self.handler.spans()):
+            i = self.list.InsertItem(self.list.GetItemCount(), time.strftime("%H:%M:%S", time.localtime(data["time"])))
+            self.list.SetItem(i, 1, data["stage"])
+            self.list.SetItem(i, 2, "%.3f" % data["seconds"])
+            self.list.SetItem(i, 3, "" if data["rows"] is None else str(data["rows"]))
+            self.list.SetItem(i, 4, "%.1f" % (data["memory"] / 2**20))
+            self.list.SetItem(i, 5, "%+.1f" % (data["memory_delta"] / 2**20))
+        for col in range(len(self.COLUMNS)):
+            self.list.SetColumnWidth(col, wx.LIST_AUTOSIZE_USEHEADER)
+
+    def on_save(self, event):
+        with wx.FileDialog(
+            self,
+            "Сохранить историю замеров",
+            defaultFile="diagnostics.jsonl",
+            wildcard="JSON Lines (*.jsonl)|*.jsonl|Текст (*.log)|*.log",
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT,
+        ) as dlg:
+            if dlg.ShowModal() == wx.ID_CANCEL:
+                return
+            path = dlg.GetPath()
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                if path.lower().endswith(".log"):
+                    # полный журнал логгера runtime
+                    for line in self.handler.get_logs():
+                        f.write(line + "\n")
+                else:
+                    for data in self.handler.spans():
+                        f.write(json.dumps(data, ensure_ascii=False) + "\n")
+        except OSError as e:
+            wx.MessageBox("Не удалось сохранить файл: %s" % e, "Диагностика", wx.ICON_ERROR)
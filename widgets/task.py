@@ -1,7 +1,27 @@
+import heapq
+import itertools
 import threading
+import traceback
 from typing import Protocol, runtime_checkable
 
 import wx
+import wx.lib.newevent
+
+# Фоновые задачи (загрузка листа, выгрузка, построение индексов).
+#
+# TaskScheduler выполняет задачи TaskJob в ограниченном пуле потоков, беря из
+# очереди сначала задачи с меньшим значением приоритета. О прогрессе и
+# завершении задачи поток сообщает событием wx в окно планировщика, так что
+# интерфейс ничего не опрашивает по таймеру. TaskPanel показывает все
+# ожидающие и выполняющиеся задачи с кнопками отмены.
+
+# приоритеты: чем меньше, тем раньше
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+TaskProgressEvent, EVT_TASK_PROGRESS = wx.lib.newevent.NewEvent()
+TaskDoneEvent, EVT_TASK_DONE = wx.lib.newevent.NewEvent()
 
 
 @runtime_checkable
@@ -11,6 +31,7 @@ class TaskJob(Protocol):
     message = None
     cancel_event = None
     lock = None
+    listener = None
 
     def __init__(self):
         self.progress = -1
@@ -18,12 +39,17 @@ class TaskJob(Protocol):
         self.message = None
         self.cancel_event = threading.Event()
         self.lock = threading.Lock()
+        # вызывается планировщиком как listener(job) после каждого set_progress
+        self.listener = None
 
     def set_progress(self, progress=-1, total=-1, message=None):
         with self.lock:
             self.progress = progress
             self.total = total
             self.message = message
+        listener = self.listener
+        if listener is not None:
+            listener(self)
 
     def run(self):
         """
@@ -35,32 +61,21 @@ class TaskJob(Protocol):
         ...
 
 
-class Task(wx.Dialog):
-    def __init__(self, title, message, job: TaskJob, parent=None, can_abort=True, show_time=True):
-        if not isinstance(job, TaskJob):
-            raise RuntimeError("invalid task job.")
-        super().__init__(parent, title=title)
-        self.was_cancelled = False
-        sz = wx.BoxSizer(wx.VERTICAL)
-        sz_in = wx.BoxSizer(wx.VERTICAL)
-        self.message = wx.StaticText(self, label=message)
-        sz_in.Add(self.message, 0, wx.EXPAND)
-        self.gauge = wx.Gauge(self, size=wx.Size(300, -1))
-        sz_in.Add(self.gauge, 0, wx.EXPAND)
-        sz.Add(sz_in, 1, wx.EXPAND | wx.ALL, border=10)
-        line = wx.StaticLine(self)
-        sz.Add(line, 0, wx.EXPAND)
-        btn_sz = wx.StdDialogButtonSizer()
-        self.cancel = wx.Button(self, label="Отменить")
-        self.cancel.Bind(wx.EVT_BUTTON, self.on_cancel)
-        btn_sz.Add(self.cancel, 0)
-        sz.Add(btn_sz, 0, wx.ALIGN_RIGHT | wx.ALL, border=10)
-        self.SetSizer(sz)
-        self.timer = wx.Timer(self)
-        self.Bind(wx.EVT_TIMER, self.on_alarm)
-        self.job = job
+class Task:
+    """
+    Задача, поставленная в TaskScheduler.submit.
 
-        self.status = "alive"
+    status: "queued" (ждет свободного потока), "alive" (выполняется),
+    "resolve" (run вернул результат, при отмене обычно None), "reject"
+    (run бросил исключение). Обработчики then вызываются в потоке интерфейса.
+    """
+
+    def __init__(self, title, job, priority, can_abort):
+        self.title = title
+        self.job = job
+        self.priority = priority
+        self.can_abort = can_abort
+        self.status = "queued"
         self._e = None
         self._ret = None
         self._on_resolve = lambda *args, **kwds: ...
@@ -69,76 +84,200 @@ class Task(wx.Dialog):
             raise e
 
         self._on_reject = on_reject
-        self._is_cancel = False
+        # событие прогресса отправлено и еще не обработано
+        self._posted = False
 
-        self.Layout()
-        self.Fit()
-        self.Bind(wx.EVT_CLOSE, self.on_cancel)
+    def then(self, on_resolve, on_reject):
+        self._on_resolve = on_resolve
+        self._on_reject = on_reject
 
-    def on_cancel(self, event):
-        self.was_cancelled = True
-        event.Skip()
+    def is_cancel(self):
+        return self.job.cancel_event.is_set()
 
-    def Update(self, progress, message=None):
-        self.gauge.SetValue(progress)
-        if message is not None:
-            self.message.SetLabelText(message)
 
-    def SetRange(self, range):
-        self.gauge.SetRange(range)
+class TaskScheduler:
+    """
+    Очередь задач с приоритетами и пулом из max_workers потоков.
 
-    def Pulse(self):
-        self.gauge.Pulse()
+    События о задачах приходят в окно target; подписчики add_listener
+    вызываются в потоке интерфейса при каждом изменении задачи (постановка,
+    прогресс, завершение). Отмена выставляет job.cancel_event: выполняющаяся
+    задача проверяет его сама, ожидающая снимается с очереди сразу и
+    завершается с результатом None.
+    """
 
-    def WasCancelled(self):
-        return self.was_cancelled
+    def __init__(self, target, max_workers=2):
+        self.target = target
+        self.cond = threading.Condition()
+        self.queue = []
+        self.counter = itertools.count()
+        self.tasks = []
+        self.listeners = []
+        target.Bind(EVT_TASK_PROGRESS, self.on_progress)
+        target.Bind(EVT_TASK_DONE, self.on_done)
+        self.workers = [threading.Thread(target=self._loop, daemon=True) for i in range(max_workers)]
+        for worker in self.workers:
+            worker.start()
 
-    def is_cancel(self):
-        return self._is_cancel
-
-    def on_alarm(self, event):
-        with self.job.lock:
-            if self.status == "alive":
-                if self.job.message is not None:
-                    self.Update(self.gauge.GetValue(), self.job.message)
-                if self.job.progress == -1:
-                    self.Pulse()
-                else:
-                    self.SetRange(self.job.total)
-                    self.Update(self.job.progress)
-                if self.WasCancelled():
-                    self.job.cancel_event.set()
-                    self._is_cancel = True
-                return
+    def add_listener(self, listener):
+        """listener(task) вызывается в потоке интерфейса."""
+        self.listeners.append(listener)
 
-        self.timer.Stop()
-        self.SetRange(1)
-        self.Update(1)
-        if self.status == "resolve":
-            self._on_resolve(self._ret)
-        elif self.status == "reject":
-            self._on_reject(self._e)
-        self.Close()
+    def submit(self, job, title, priority=NORMAL, can_abort=True):
+        if not isinstance(job, TaskJob):
+            raise RuntimeError("invalid task job.")
+        task = Task(title, job, priority, can_abort)
+        job.listener = lambda job: self._post(TaskProgressEvent, task)
+        with self.cond:
+            heapq.heappush(self.queue, (priority, next(self.counter), task))
+            self.tasks.append(task)
+            self.cond.notify()
+        self._notify(task)
+        return task
 
-    def then(self, on_resolve, on_reject):
-        self._on_resolve = on_resolve
-        self._on_reject = on_reject
+    def cancel(self, task):
+        if not task.can_abort:
+            return
+        task.job.cancel_event.set()
+        with self.cond:
+            queued = task.status == "queued"
+            if queued:
+                self.queue = [item for item in self.queue if item[2] is not task]
+                heapq.heapify(self.queue)
+                task.status = "resolve"
+        if queued:
+            self._post(TaskDoneEvent, task)
+        else:
+            self._notify(task)
 
-    def run(self):
-        def task(job):
-            ret = None
+    def cancel_all(self):
+        for task in list(self.tasks):
+            self.cancel(task)
+
+    def is_busy(self):
+        return bool(self.tasks)
+
+    def _post(self, event_class, task):
+        if event_class is TaskProgressEvent:
+            # пока прошлое событие не обработано, новое не нужно: окно прочитает
+            # последний прогресс задачи
+            with task.job.lock:
+                if task._posted:
+                    return
+                task._posted = True
+        try:
+            wx.PostEvent(self.target, event_class(task=task))
+        except RuntimeError:
+            # окно уже закрыто
+            ...
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                _, _, task = heapq.heappop(self.queue)
+                task.status = "alive"
+            self._post(TaskProgressEvent, task)
             try:
-                ret = job.run()
+                ret = task.job.run()
             except Exception as e:
-                with self.job.lock:
-                    self.status = "reject"
-                    self._e = e
+                print(traceback.format_exc())
+                task._e = e
+                task.status = "reject"
             else:
-                with self.job.lock:
-                    self.status = "resolve"
-                    self._ret = ret
-
-        self.thread = threading.Thread(target=task, args=(self.job,))
-        self.thread.start()
-        self.timer.Start(100)
-        self.ShowModal()
\ No newline at end of file
+                task._ret = ret
+                task.status = "resolve"
+            self._post(TaskDoneEvent, task)
+
+    def _notify(self, task):
+        for listener in self.listeners:
+            listener(task)
+
+    def on_progress(self, event):
+        task = event.task
+        with task.job.lock:
+            task._posted = False
+        self._notify(task)
+
+    def on_done(self, event):
+        task = event.task
+        if task in self.tasks:
+            self.tasks.remove(task)
+        self._notify(task)
+        if task.status == "resolve":
+            task._on_resolve(task._ret)
+        else:
+            task._on_reject(task._e)
+
+
+class TaskRow(wx.Panel):
+    def __init__(self, parent, scheduler, task):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.task = task
+        sz = wx.BoxSizer(wx.HORIZONTAL)
+        sz_in = wx.BoxSizer(wx.VERTICAL)
+        self.message = wx.StaticText(self, label=task.title)
+        sz_in.Add(self.message, 0, wx.EXPAND)
+        self.gauge = wx.Gauge(self, size=wx.Size(300, -1))
+        sz_in.Add(self.gauge, 0, wx.EXPAND)
+        sz.Add(sz_in, 1, wx.EXPAND | wx.RIGHT, border=10)
+        self.cancel = wx.Button(self, label="Отменить")
+        self.cancel.Bind(wx.EVT_BUTTON, self.on_cancel)
+        self.cancel.Enable(task.can_abort)
+        sz.Add(self.cancel, 0, wx.ALIGN_CENTER_VERTICAL)
+        self.SetSizer(sz)
+
+    def on_cancel(self, event):
+        self.scheduler.cancel(self.task)
+
+    def refresh(self):
+        job = self.task.job
+        with job.lock:
+            progress, total, message = job.progress, job.total, job.message
+        if self.task.is_cancel():
+            self.cancel.Disable()
+            message = "отмена..."
+        elif self.task.status == "queued":
+            message = "ожидает очереди..."
+        label = self.task.title if message is None else "%s: %s" % (self.task.title, message)
+        if label != self.message.GetLabelText():
+            self.message.SetLabelText(label)
+        if progress == -1 or total <= 0:
+            self.gauge.Pulse()
+        else:
+            self.gauge.SetRange(total)
+            self.gauge.SetValue(min(progress, total))
+
+
+class TaskPanel(wx.Panel):
+    """Немодальная панель со всеми задачами планировщика; скрыта, если задач нет."""
+
+    def __init__(self, parent, scheduler):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.rows = {}
+        self.sz = wx.BoxSizer(wx.VERTICAL)
+        self.SetSizer(self.sz)
+        scheduler.add_listener(self.on_task)
+        self.Hide()
+
+    def on_task(self, task):
+        if not self:  # окно могло быть уже закрыто
+            return
+        row = self.rows.get(task)
+        if task.status in ("resolve", "reject"):
+            if row is None:
+                return
+            del self.rows[task]
+            row.Destroy()
+        elif row is None:
+            row = self.rows[task] = TaskRow(self, self.scheduler, task)
+            self.sz.Add(row, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, border=5)
+            row.refresh()
+        else:
+            row.refresh()
+            return
+        self.Show(bool(self.rows))
+        self.GetParent().Layout()
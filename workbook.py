@@ -0,0 +1,213 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from coltypes import convert_typed, sort_order
+from encoding import encode_repeated
+from maskcache import MaskCache
+from perf import span
+import sheetreader
+import transform
+import xlsxprobe
+
+
+class SheetData:
+    """
+    Разобранный лист книги. К нему же привязываются производные данные, чтобы
+    они жили ровно столько, сколько живет сам лист.
+
+    Числовые столбцы и даты хранятся типизированными (coltypes.convert_typed),
+    текстовые столбцы с повторяющимися значениями - как category
+    (encoding.encode_repeated). Исходный текст любого столбца дает
+    coltypes.format_column.
+    """
+
+    def __init__(self, name, df, float_dtype=np.float64):
+        self.name = name
+        with span("convert", len(df)):
+            self.df = encode_repeated(convert_typed(df, float_dtype))
+        self.masks = MaskCache()
+        self.lock = threading.Lock()
+        self._geodesic = None
+
+    def geodesic(self, x_col, y_col, z_col, matrix=None):
+        """
+        Геодезические координаты всех событий листа (см. transform.geodesic_frame).
+        Результат кэшируется до смены столбцов X/Y/Z или матрицы преобразования.
+        """
+        if matrix is None:
+            matrix = transform.asksm_geod()
+        key = (x_col, y_col, z_col, matrix.tobytes())
+        with self.lock:
+            if self._geodesic is not None and self._geodesic[0] == key:
+                return self._geodesic[1]
+        frame = transform.geodesic_frame(self.df, x_col, y_col, z_col, matrix)
+        with self.lock:
+            self._geodesic = (key, frame)
+        return frame
+
+    def sort_order(self, code):
+        """
+        Устойчивая перестановка всех строк листа по возрастанию столбца code
+        (столбца листа или геодезического из последнего вызова geodesic).
+        Считается по требованию; в MaskCache листа хранится перестановка только
+        последнего отсортированного столбца (int32, если строк меньше 2**31),
+        переключение направления сортировки ее не пересчитывает.
+        """
+        if code in transform.GEO_COLUMNS:
+            with self.lock:
+                geo_key, frame = self._geodesic
+            series = frame[code]
+            key = (code,) + geo_key
+        else:
+            series = self.df[code]
+            key = (code,)
+        dtype = np.int32 if len(series) < 2**31 else np.intp
+        return self.masks.get("sort", key, lambda: sort_order(series), dtype=dtype)
+
+
+class Workbook:
+    """
+    Сессия работы с одной книгой Excel. Книга открывается один раз, каждый лист
+    разбирается не более одного раза (или берется из дискового кэша), после чего
+    все обращения к листу получают один и тот же SheetData.
+
+    Список листов и заголовки для .xlsx читаются напрямую из архива, поэтому
+    сама книга открывается только когда нужны данные листа.
+    """
+
+    def __init__(self, path, cache=None, float_dtype=np.float64):
+        self.path = path
+        self.cache = cache
+        self.float_dtype = float_dtype
+        self.lock = threading.RLock()
+        # pd.ExcelFile не потокобезопасен; отдельная блокировка, чтобы долгое
+        # чтение .xls не держало self.lock (порядок: self.lock, затем excel_lock)
+        self.excel_lock = threading.Lock()
+        self.xls = None
+        self.is_xlsx = xlsxprobe.is_xlsx(path)
+        self.sheet_names = None
+        if self.is_xlsx:
+            try:
+                self.sheet_names = xlsxprobe.sheet_names(path)
+            except Exception as e:
+                print("cannot probe workbook %s, %s" % (path, e))
+                self.is_xlsx = False
+        if self.sheet_names is None:
+            with self.excel_lock:
+                self.sheet_names = self._excel().sheet_names
+        self.sheets = {}
+        self.headers = {}
+
+    def _excel(self):
+        if self.xls is None:
+            self.xls = pd.ExcelFile(self.path)
+        return self.xls
+
+    def header(self, sheet_name):
+        with self.lock:
+            if sheet_name in self.sheets:
+                return self.sheets[sheet_name].df.columns.tolist()
+            if sheet_name not in self.headers:
+                header = None
+                with span("probe"):
+                    if self.is_xlsx:
+                        try:
+                            header = xlsxprobe.first_row(self.path, sheet_name)
+                        except Exception as e:
+                            print("cannot probe sheet %s, %s" % (sheet_name, e))
+                    if header is None:
+                        with self.excel_lock:
+                            header = pd.read_excel(
+                                self._excel(), nrows=0, sheet_name=sheet_name
+                            ).columns.tolist()
+                self.headers[sheet_name] = header
+            return self.headers[sheet_name]
+
+    def is_loaded(self, sheet_name):
+        with self.lock:
+            return sheet_name in self.sheets
+
+    def cached(self, sheet_name):
+        """
+        Возвращает лист из памяти или дискового кэша, None если лист еще не разбирался.
+        Чтение кэша и приведение типов идут без блокировки книги (см. add).
+        """
+        with self.lock:
+            data = self.sheets.get(sheet_name)
+        if data is not None or self.cache is None:
+            return data
+        with span("cache_load") as info:
+            df = self.cache.get(self.path, sheet_name)
+            if df is not None:
+                info["rows"] = len(df)
+        if df is None:
+            return None
+        return self._publish(sheet_name, SheetData(sheet_name, df, self.float_dtype))
+
+    def read(self, sheet_name, progress=None, cancelled=None, on_chunk=None):
+        """
+        Разбирает лист из файла, не трогая кэши. Для .xlsx лист читается потоково,
+        см. sheetreader.read_sheet. Возвращает None, если чтение прервано.
+        """
+        with span("parse") as info:
+            if self.is_xlsx:
+                df = sheetreader.read_sheet(
+                    self.path,
+                    sheet_name,
+                    progress=progress,
+                    cancelled=cancelled,
+                    on_chunk=on_chunk,
+                )
+            else:
+                with self.excel_lock:
+                    df = pd.read_excel(
+                        self._excel(),
+                        dtype=str,
+                        na_filter=False,
+                        sheet_name=sheet_name,
+                    )
+                # заголовки из xlsxprobe всегда строки
+                df.columns = [str(c) for c in df.columns]
+            if df is not None:
+                info["rows"] = len(df)
+        return df
+
+    def add(self, sheet_name, df):
+        """
+        Запоминает разобранный лист в сессии и в дисковом кэше. Приведение типов
+        и запись кэша занимают секунды, поэтому книга блокируется только на время
+        публикации листа: is_loaded, header и cached из потока интерфейса не ждут.
+        """
+        data = SheetData(sheet_name, df, self.float_dtype)
+        published = self._publish(sheet_name, data)
+        if published is data and self.cache is not None:
+            self.cache.put(self.path, sheet_name, data.df)
+        return published
+
+    def _publish(self, sheet_name, data):
+        # если лист успели опубликовать из другого потока, оставляем его
+        # вместе с накопленными масками и сортировками
+        with self.lock:
+            return self.sheets.setdefault(sheet_name, data)
+
+    def sheet(self, sheet_name):
+        data = self.cached(sheet_name)
+        if data is None:
+            data = self.add(sheet_name, self.read(sheet_name))
+        return data
+
+    def invalidate_masks(self, *names):
+        """Сбрасывает маски критериев names у всех разобранных листов (см. MaskCache.invalidate)."""
+        with self.lock:
+            for data in self.sheets.values():
+                data.masks.invalidate(*names)
+
+    def close(self):
+        with self.lock, self.excel_lock:
+            if self.xls is not None:
+                self.xls.close()
+                self.xls = None
+            self.sheets = {}
+            self.headers = {}
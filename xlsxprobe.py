@@ -0,0 +1,167 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Быстрое чтение списка листов и строки заголовка прямо из zip-архива .xlsx,
+# без загрузки книги через openpyxl.
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def is_xlsx(path):
+    return zipfile.is_zipfile(path)
+
+
+def _sheet_parts(zf):
+    """Возвращает список (имя листа, путь к xml листа внутри архива)."""
+    rels = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as f:
+        for rel in ET.parse(f).getroot().iter(PKG_REL_NS + "Relationship"):
+            target = rel.get("Target")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            rels[rel.get("Id")] = target
+    parts = []
+    with zf.open("xl/workbook.xml") as f:
+        for sheet in ET.parse(f).getroot().iter(MAIN_NS + "sheet"):
+            parts.append((sheet.get("name"), rels.get(sheet.get(REL_NS + "id"))))
+    return parts
+
+
+def sheet_names(path):
+    with zipfile.ZipFile(path) as zf:
+        return [name for name, _ in _sheet_parts(zf)]
+
+
+def _column_index(ref):
+    letters = re.match(r"[A-Z]+", ref).group(0)
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - ord("A") + 1
+    return index - 1
+
+
+def _text(elem):
+    # текст может быть разбит на несколько runs, фонетику (rPh) пропускаем
+    parts = []
+    for child in elem:
+        if child.tag == MAIN_NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == MAIN_NS + "r":
+            t = child.find(MAIN_NS + "t")
+            if t is not None:
+                parts.append(t.text or "")
+    return "".join(parts)
+
+
+def _shared_strings(zf, needed):
+    """Читает sharedStrings.xml только до максимального нужного индекса."""
+    strings = {}
+    if not needed or "xl/sharedStrings.xml" not in zf.namelist():
+        return strings
+    last = max(needed)
+    with zf.open("xl/sharedStrings.xml") as f:
+        i = 0
+        for event, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag != MAIN_NS + "si":
+                continue
+            if i in needed:
+                strings[i] = _text(elem)
+            elem.clear()
+            if i >= last:
+                break
+            i += 1
+    return strings
+
+
+def _number(value):
+    try:
+        num = float(value)
+    except ValueError:
+        return value
+    return str(int(num)) if num.is_integer() else str(num)
+
+
+def first_row(path, sheet_name):
+    """
+    Возвращает первую строку листа в виде списка строк, так же как pandas
+    строит заголовок: пустые ячейки называются "Unnamed: N", повторяющиеся
+    имена получают суффикс ".1", ".2" и т.д.
+
+    Заголовком, как и в pandas и sheetreader, считается физическая первая
+    строка, даже пустая (или отсутствующая в xml). Тогда все столбцы
+    называются "Unnamed: N", а их число берется из <dimension> листа или, если
+    его нет, из первой непустой строки.
+    """
+    with zipfile.ZipFile(path) as zf:
+        parts = dict(_sheet_parts(zf))
+        if parts.get(sheet_name) is None:
+            raise KeyError("sheet %s not found" % sheet_name)
+        cells = {}
+        header_cells = None
+        width = 0
+        with zf.open(parts[sheet_name]) as f:
+            for event, elem in ET.iterparse(f, events=("end",)):
+                if elem.tag == MAIN_NS + "dimension":
+                    ref = elem.get("ref", "").split(":")[-1].replace("$", "")
+                    if ref[:1].isalpha():
+                        width = _column_index(ref) + 1
+                elif elem.tag == MAIN_NS + "c":
+                    ref = elem.get("r")
+                    col = _column_index(ref) if ref else len(cells)
+                    kind = elem.get("t", "n")
+                    if kind == "inlineStr":
+                        inline = elem.find(MAIN_NS + "is")
+                        cells[col] = ("str", _text(inline) if inline is not None else "")
+                    else:
+                        v = elem.find(MAIN_NS + "v")
+                        if v is not None and v.text is not None:
+                            cells[col] = (kind, v.text)
+                elif elem.tag == MAIN_NS + "row":
+                    if header_cells is None:
+                        # строка 1 может отсутствовать в xml, тогда это уже строка данных
+                        header_cells = cells if elem.get("r", "1") == "1" else {}
+                        if header_cells:
+                            width = max(header_cells) + 1
+                            break
+                    if width or cells:
+                        # пустой заголовок: нужна только ширина листа
+                        width = width or max(cells) + 1
+                        break
+                    cells = {}
+                    elem.clear()
+        if header_cells is None:
+            # в листе нет строк
+            header_cells = {}
+            width = 0
+        shared = _shared_strings(
+            zf, {int(v) for kind, v in header_cells.values() if kind == "s"}
+        )
+        cells = header_cells
+
+    row = []
+    for i in range(width):
+        kind, value = cells.get(i, ("str", ""))
+        if kind == "s":
+            value = shared.get(int(value), "")
+        elif kind == "b":
+            value = "True" if value == "1" else "False"
+        elif kind == "n":
+            value = _number(value)
+        row.append(value if value != "" else "Unnamed: %d" % i)
+
+    seen = {}
+    header = []
+    for name in row:
+        if name in seen:
+            seen[name] += 1
+            name = "%s.%d" % (name, seen[name])
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header